@@ -0,0 +1,200 @@
+import asyncio
+import collections
+import json
+import os
+import time
+
+from cogs.music.request_log import request_log
+
+STATE_PATH = "analytics.json"
+PERSIST_INTERVAL = 5 * 60  # seconds between saves of the counters
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# window: (seconds in one bucket, amount of buckets)
+WINDOWS = {
+    "day": (HOUR, 24),
+    "week": (DAY, 7),
+    "month": (DAY, 30),
+}
+
+
+class RingCounter:
+    """Counts of keys over a sliding window, split into fixed buckets.
+
+    Buckets form a ring, the one a request falls into is picked by time,
+    and buckets that the window slid past are emptied before they are
+    reused. So the window slides by whole buckets and nothing has to be
+    pruned per request.
+    """
+
+    def __init__(self, bucket_seconds, size):
+        self.bucket_seconds = bucket_seconds
+        self.size = size
+        self.buckets = [collections.Counter() for _ in range(size)]
+        self.last = None  # absolute number of the newest bucket
+
+    def _advance(self, now):
+        current = int(now // self.bucket_seconds)
+        if self.last is None or current - self.last >= self.size:
+            for bucket in self.buckets:
+                bucket.clear()
+        else:
+            for number in range(self.last + 1, current + 1):
+                self.buckets[number % self.size].clear()
+        self.last = max(current, self.last or current)
+        return current
+
+    def add(self, key, now):
+        current = self._advance(now)
+        self.buckets[current % self.size][key] += 1
+
+    def total(self, now):
+        self._advance(now)
+        total = collections.Counter()
+        for bucket in self.buckets:
+            total.update(bucket)
+        return total
+
+    def to_dict(self):
+        return {"last": self.last, "buckets": [dict(b) for b in self.buckets]}
+
+    @classmethod
+    def from_dict(cls, state, bucket_seconds, size):
+        counter = cls(bucket_seconds, size)
+        if len(state["buckets"]) == size:
+            counter.last = state["last"]
+            counter.buckets = [
+                collections.Counter(bucket) for bucket in state["buckets"]
+            ]
+        return counter
+
+
+class Analytics:
+    """Live counters of top tracks and requesters per guild over the last
+    day, week and month, fed by request_log as requests happen. Answers
+    come from memory, the counters are saved to STATE_PATH periodically
+    and loaded back at startup.
+    """
+
+    def __init__(self, path=STATE_PATH):
+        self.path = path
+        self.guilds = {}  # guild ID: {window: {"tracks"|"requesters": ...}}
+        self.titles = {}  # webpage_url: title
+        self.task = None
+
+    def _counters(self, guild_id):
+        if guild_id not in self.guilds:
+            self.guilds[guild_id] = {
+                window: {
+                    "tracks": RingCounter(*WINDOWS[window]),
+                    "requesters": RingCounter(*WINDOWS[window]),
+                }
+                for window in WINDOWS
+            }
+        return self.guilds[guild_id]
+
+    def add(self, event):
+        """Counts a new request event, ones without a guild are skipped."""
+
+        if event.guild_id is None:
+            return
+
+        now = time.time()
+        self.titles[event.webpage_url] = event.title
+        for counters in self._counters(event.guild_id).values():
+            counters["tracks"].add(event.webpage_url, now)
+            counters["requesters"].add(event.requester, now)
+
+    def top(self, guild_id, window, limit=10):
+        """Gets top tracks and requesters of the guild in the window.
+
+        Args:
+            guild_id (int): ID of the guild
+            window (str): key of WINDOWS
+            limit (int, optional): Defaults to 10.
+
+        Returns:
+            Tuple[List[Tuple[str, str, int]], List[Tuple[str, int]]]:
+                (title, webpage_url, count) of tracks and (name, count) of
+                requesters, most requested first
+        """
+
+        if guild_id not in self.guilds:
+            return [], []
+
+        now = time.time()
+        counters = self.guilds[guild_id][window]
+        tracks = counters["tracks"].total(now).most_common(limit)
+        requesters = counters["requesters"].total(now).most_common(limit)
+
+        return (
+            [(self.titles.get(url, url), url, n) for url, n in tracks],
+            requesters,
+        )
+
+    def to_dict(self):
+        guilds = {
+            str(guild_id): {
+                window: {
+                    name: counter.to_dict()
+                    for name, counter in counters.items()
+                }
+                for window, counters in windows.items()
+            }
+            for guild_id, windows in self.guilds.items()
+        }
+        # titles of tracks that fell out of every window are dropped
+        urls = {
+            url
+            for windows in guilds.values()
+            for counters in windows.values()
+            for bucket in counters["tracks"]["buckets"]
+            for url in bucket
+        }
+        titles = {url: self.titles[url] for url in urls if url in self.titles}
+
+        return {"guilds": guilds, "titles": titles}
+
+    def load(self):
+        """Loads saved counters, if there are any."""
+
+        if not os.path.isfile(self.path):
+            return
+
+        with open(self.path, encoding="utf-8") as file:
+            state = json.load(file)
+
+        self.titles.update(state["titles"])
+        for guild_id, windows in state["guilds"].items():
+            guild = self._counters(int(guild_id))
+            for window, counters in windows.items():
+                if window not in WINDOWS:
+                    continue
+                for name, counter in counters.items():
+                    guild[window][name] = RingCounter.from_dict(
+                        counter, *WINDOWS[window]
+                    )
+
+    def save(self, state):
+        """Writes the state (from to_dict) atomically. Blocking, run it in
+        an executor."""
+
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+        os.replace(temp_path, self.path)
+
+    async def run(self, loop):
+        """Saves the counters periodically in the background."""
+
+        while True:
+            await asyncio.sleep(PERSIST_INTERVAL)
+            try:
+                await loop.run_in_executor(None, self.save, self.to_dict())
+            except OSError as err:
+                print(f"Analytics could not be saved: {err}")
+
+
+analytics = Analytics()
+request_log.subscribe(analytics.add)
@@ -0,0 +1,220 @@
+import collections
+import threading
+import time
+
+import discord
+
+from cogs.music.source import recover_stream, resolve_stream
+from cogs.music.streaming import FRAME_DURATION, SILENCE_FRAME, StreamingSource
+
+RING_FRAMES = 150  # frames kept for listeners that fall behind, 3s
+MAX_LAG_FRAMES = 5  # the pump further behind skips ahead instead of bursting
+JITTER_FRAMES = 10  # listeners start this far behind the newest frame, 200ms
+
+
+class Broadcast:
+    """One upstream decode shared by all guilds tuned in to a station.
+
+    A pump thread reads the tracks of the station one after another at
+    real-time pace, from a single StreamingSource (one extraction, one
+    ffmpeg), into a ring of recent frames. Every listener reads the ring
+    at its own cursor, so N guilds cost one ffmpeg instead of N.
+
+    Args:
+        key (str): URL the station was tuned in with
+        tracks (List[Dict]): title and webpage_url of tracks to play in a
+            loop, a single one for a live stream
+        on_end (Callable[[Broadcast], None]): called once it stops
+    """
+
+    def __init__(self, key, tracks, *, on_end):
+        self.key = key
+        self.tracks = tracks
+        self.on_end = on_end
+        self.title = tracks[0]["title"]
+        self.listeners = set()
+
+        self.frames = collections.deque(maxlen=RING_FRAMES)
+        self.sequence = 0  # number of the newest frame in the ring
+        self.ended = False
+        self._cond = threading.Condition()
+        self._stream = None
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _open(self, track):
+        data = resolve_stream(track["webpage_url"])
+        self.title = data["title"]
+
+        def resolve(failed_url):
+            return recover_stream(data["webpage_url"], failed_url)["url"]
+
+        return StreamingSource(
+            data["url"], duration=data["duration"], resolve=resolve
+        )
+
+    def _run(self):
+        index = 0
+        failures = 0  # tracks in a row that could not be opened
+        try:
+            while not self.ended:
+                try:
+                    self._stream = self._open(self.tracks[index])
+                except Exception as err:
+                    print(f"Broadcast of {self.key} failed: {err}")
+                    failures += 1
+                    # a whole pass without a playable track, stop instead
+                    # of hammering the extractor
+                    if failures >= len(self.tracks):
+                        break
+                else:
+                    failures = 0
+                    self._pump(self._stream)
+                    self._stream.cleanup()
+                index = (index + 1) % len(self.tracks)
+        finally:
+            self.stop()
+
+    def _pump(self, stream):
+        next_time = time.perf_counter()
+        while not self.ended:
+            data = stream.read()
+            if not data:
+                return
+
+            with self._cond:
+                self.frames.append(data)
+                self.sequence += 1
+                self._cond.notify_all()
+
+            next_time += FRAME_DURATION
+            delay = next_time - time.perf_counter()
+            if delay < -FRAME_DURATION * MAX_LAG_FRAMES:
+                next_time = time.perf_counter()
+            time.sleep(max(delay, 0))
+
+    def read(self, cursor):
+        """Gets the frame after the cursor, without waiting for the pump.
+
+        Args:
+            cursor (int): sequence number of the last frame read
+
+        Returns:
+            Tuple[int, bytes]: new cursor and the frame, b"" once the
+                broadcast has ended
+        """
+
+        with self._cond:
+            if self.ended:
+                return cursor, b""
+            if cursor >= self.sequence:
+                return cursor, SILENCE_FRAME  # upstream is late
+
+            # a listener that fell behind the ring catches up to its start
+            oldest = self.sequence - len(self.frames) + 1
+            cursor = max(cursor + 1, oldest)
+            return cursor, self.frames[cursor - oldest]
+
+    def listen(self):
+        """Gets a new listener, starting JITTER_FRAMES behind the newest
+        frame, so that the pump running a bit late does not starve it."""
+
+        with self._cond:
+            oldest = self.sequence - len(self.frames)
+            listener = BroadcastListener(
+                self, max(self.sequence - JITTER_FRAMES, oldest)
+            )
+            self.listeners.add(listener)
+        return listener
+
+    def leave(self, listener):
+        with self._cond:
+            self.listeners.discard(listener)
+            empty = not self.listeners
+        if empty:
+            self.stop()
+
+    def stop(self):
+        with self._cond:
+            if self.ended:
+                return
+            self.ended = True
+            self._cond.notify_all()
+
+        if self._stream:
+            self._stream.cleanup()
+        self.on_end(self)
+
+
+class BroadcastListener(discord.AudioSource):
+    """Source of one voice client tuned in to a broadcast. Wrap it in
+    DSPTransformer for the guild's own volume."""
+
+    def __init__(self, broadcast, cursor):
+        self.broadcast = broadcast
+        self.cursor = cursor  # sequence number of the last frame read
+        self.on_leave = None  # called once it is not played anymore
+
+    def read(self):
+        self.cursor, data = self.broadcast.read(self.cursor)
+        return data
+
+    def cleanup(self):
+        self.broadcast.leave(self)
+        if self.on_leave:
+            self.on_leave()
+
+
+def is_tuned_in(vc):
+    """Whether the voice client plays a broadcast."""
+
+    source = vc.source if vc else None
+    return isinstance(getattr(source, "original", None), BroadcastListener)
+
+
+def hand_over(vc):
+    """Stops the broadcast the voice client plays, without calling the
+    listener's on_leave, as whatever plays next takes over its session."""
+
+    vc.source.original.on_leave = None
+    vc.stop()
+
+
+class Stations:
+    """Broadcasts running in this process, keyed by the URL they were
+    tuned in with, shared by all guilds and bots."""
+
+    def __init__(self):
+        self.broadcasts = {}
+        self._lock = threading.Lock()
+
+    def tune_in(self, key, tracks):
+        """Gets a listener of the station, starting its broadcast if it is
+        not running yet.
+
+        Args:
+            key (str): URL of the station (stream or playlist)
+            tracks (List[Dict]): its tracks, used if it is not running
+
+        Returns:
+            BroadcastListener | None: source for the voice client, None if
+                the station is not running and there are no tracks
+        """
+
+        with self._lock:
+            broadcast = self.broadcasts.get(key)
+            if broadcast is None or broadcast.ended:
+                if not tracks:
+                    return None
+                broadcast = Broadcast(key, tracks, on_end=self._ended)
+                self.broadcasts[key] = broadcast
+            return broadcast.listen()
+
+    def _ended(self, broadcast):
+        with self._lock:
+            if self.broadcasts.get(broadcast.key) is broadcast:
+                del self.broadcasts[broadcast.key]
+
+
+stations = Stations()
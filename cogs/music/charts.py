@@ -0,0 +1,123 @@
+import io
+
+from PIL import Image, ImageDraw, ImageFont
+
+WIDTH = 800
+ROW_HEIGHT = 26
+TIMELINE_HEIGHT = 360
+MARGIN = 20
+MAX_LABEL_CHARS = 48
+
+# charts are rendered in worker processes (see cogs.music.stats), so the
+# functions take and return plain picklable data only
+
+BACKGROUND = (47, 49, 54)  # discord's dark theme
+TEXT = (220, 221, 222)
+MUTED = (142, 146, 151)
+BARS = ((88, 101, 242), (87, 242, 135))
+
+
+def _to_png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _shorten(label):
+    label = str(label)
+    if len(label) <= MAX_LABEL_CHARS:
+        return label
+    return label[: MAX_LABEL_CHARS - 3] + "..."
+
+
+def render_leaderboard(title, panels):
+    """Draws panels of horizontal bars, one bar per ranked item.
+
+    Args:
+        title (str): heading of the image
+        panels (List[Tuple[str, List[Tuple[str, int]]]]): heading of each
+            panel with its (label, count) rows, highest count first
+
+    Returns:
+        bytes: PNG image
+    """
+
+    font = ImageFont.load_default()
+    rows = sum(len(items) + 2 for _, items in panels)
+    height = 2 * MARGIN + ROW_HEIGHT * (rows + 1)
+
+    image = Image.new("RGB", (WIDTH, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    draw.text((MARGIN, MARGIN), title, fill=TEXT, font=font)
+
+    label_width = WIDTH // 2
+    bar_space = WIDTH - label_width - 2 * MARGIN - 40
+    y = MARGIN + ROW_HEIGHT * 2
+    for panel, (heading, items) in enumerate(panels):
+        draw.text((MARGIN, y), heading, fill=MUTED, font=font)
+        y += ROW_HEIGHT
+
+        top = max((count for _, count in items), default=0) or 1
+        for rank, (label, count) in enumerate(items, 1):
+            draw.text(
+                (MARGIN, y + 6),
+                f"{rank}. {_shorten(label)}",
+                fill=TEXT,
+                font=font,
+            )
+            x0 = label_width
+            x1 = x0 + max(int(bar_space * count / top), 1)
+            draw.rectangle(
+                (x0, y + 4, x1, y + ROW_HEIGHT - 4),
+                fill=BARS[panel % len(BARS)],
+            )
+            draw.text((x1 + 6, y + 6), str(count), fill=TEXT, font=font)
+            y += ROW_HEIGHT
+        y += ROW_HEIGHT
+
+    return _to_png(image)
+
+
+def render_timeline(title, buckets):
+    """Draws vertical bars of counts over consecutive periods.
+
+    Args:
+        title (str): heading of the image
+        buckets (List[Tuple[str, int]]): label and count of each period,
+            oldest first
+
+    Returns:
+        bytes: PNG image
+    """
+
+    font = ImageFont.load_default()
+    image = Image.new("RGB", (WIDTH, TIMELINE_HEIGHT), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    draw.text((MARGIN, MARGIN), title, fill=TEXT, font=font)
+    if not buckets:
+        return _to_png(image)
+
+    top = max(count for _, count in buckets) or 1
+    chart_top = MARGIN + ROW_HEIGHT * 2
+    chart_bottom = TIMELINE_HEIGHT - MARGIN - ROW_HEIGHT
+    slot = (WIDTH - 2 * MARGIN) / len(buckets)
+    label_every = max(1, int(60 // slot))  # labels at least 60px apart
+
+    draw.line(
+        (MARGIN, chart_bottom, WIDTH - MARGIN, chart_bottom), fill=MUTED
+    )
+    draw.text(
+        (MARGIN, chart_top - ROW_HEIGHT), f"max {top}", fill=MUTED, font=font
+    )
+    for i, (label, count) in enumerate(buckets):
+        x0 = MARGIN + i * slot + slot * 0.15
+        x1 = MARGIN + (i + 1) * slot - slot * 0.15
+        y0 = chart_bottom - (chart_bottom - chart_top) * count / top
+        if count:
+            draw.rectangle((x0, y0, x1, chart_bottom), fill=BARS[0])
+        if i % label_every == 0:
+            draw.text(
+                (x0, chart_bottom + 6), label, fill=MUTED, font=font
+            )
+
+    return _to_png(image)
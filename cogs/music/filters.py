@@ -0,0 +1,30 @@
+import math
+
+# name: (ffmpeg filtergraph, playback speed)
+FILTERS = {
+    "bassboost": ("bass=g=8", 1.0),
+    "nightcore": ("aresample=48000,asetrate=60000,aresample=48000", 1.25),
+    "vaporwave": ("aresample=48000,asetrate=38400,aresample=48000", 0.8),
+    "speed": ("atempo=1.25", 1.25),
+    "mono": ("pan=mono|c0=0.5*c0+0.5*c1", 1.0),
+    "8d": ("apulsator=hz=0.125", 1.0),
+}
+
+
+def build_filtergraph(names):
+    """Joins filters into one ffmpeg filtergraph (for -af option).
+
+    Args:
+        names (Iterable[str]): names of filters from FILTERS
+
+    Returns:
+        str: filtergraph, empty if there are no filters
+    """
+
+    return ",".join(FILTERS[name][0] for name in names)
+
+
+def get_speed(names):
+    """Gets how many seconds of the track play in one second of audio."""
+
+    return math.prod(FILTERS[name][1] for name in names)
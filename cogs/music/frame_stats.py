@@ -0,0 +1,124 @@
+import bisect
+import collections
+
+from cogs.music.streaming import FRAME_DURATION
+
+# upper bounds (seconds) of histogram buckets, the last one is open-ended
+BUCKET_BOUNDS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.04)
+BUCKET_LABELS = ("<1", "<2", "<5", "<10", "<20", "<40", "40+")
+PAUSE_GAP = 1  # seconds between reads that mean a pause, not drift
+GAP_HISTORY = 50  # track transitions whose silence is kept
+
+
+class FrameStats:
+    """Timing of the frames of one guild's audio.
+
+    Read latency is how long producing a frame took (DSP, buffer, ffmpeg),
+    a late read is one longer than a frame. Send drift is how far the
+    voice sender deviated from reading a frame every 20ms, a late send is
+    one that came a whole frame late. Underruns are frames of silence
+    sent because ffmpeg had nothing buffered. Each frame costs just a few
+    counter increments, as it gets recorded from the voice thread. Gaps
+    are frames of silence between a track and the next one (gapless).
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.reads = [0] * len(BUCKET_LABELS)  # read latency histogram
+        self.drifts = [0] * len(BUCKET_LABELS)  # send drift histogram
+        self.late_reads = 0
+        self.late_sends = 0
+        self.underruns = 0
+        self.max_drift = 0.0
+        self.gaps = collections.deque(maxlen=GAP_HISTORY)
+        self._last_read = None
+
+    def record(self, started, finished):
+        """Records a frame read.
+
+        Args:
+            started (float): time.perf_counter() before the read
+            finished (float): time.perf_counter() after the read
+        """
+
+        self.frames += 1
+        latency = finished - started
+        self.reads[bisect.bisect_left(BUCKET_BOUNDS, latency)] += 1
+        if latency > FRAME_DURATION:
+            self.late_reads += 1
+
+        last_read, self._last_read = self._last_read, started
+        if last_read is None or started - last_read > PAUSE_GAP:
+            return
+
+        drift = abs(started - last_read - FRAME_DURATION)
+        self.drifts[bisect.bisect_left(BUCKET_BOUNDS, drift)] += 1
+        if drift > FRAME_DURATION:
+            self.late_sends += 1
+        self.max_drift = max(self.max_drift, drift)
+
+    def record_gap(self, silence_frames):
+        """Records the silence frames sent while switching tracks."""
+
+        self.gaps.append(silence_frames)
+
+    @property
+    def bad_share(self):
+        """Share of frames that were late or silent."""
+
+        bad = self.late_reads + self.late_sends + self.underruns
+        return bad / self.frames if self.frames else 0.0
+
+    def summary(self):
+        def histogram(counts):
+            return " ".join(
+                f"{label}:{count}"
+                for label, count in zip(BUCKET_LABELS, counts)
+                if count
+            )
+
+        summary = (
+            f"frames {self.frames}, {self.bad_share:.2%} bad: "
+            f"{self.late_reads} late reads, {self.late_sends} late sends, "
+            f"{self.underruns} underruns, "
+            f"max drift {self.max_drift * 1000:.1f} ms\n"
+            f"  read ms  {histogram(self.reads)}\n"
+            f"  drift ms {histogram(self.drifts)}\n"
+        )
+        if self.gaps:
+            gaps = [frames * FRAME_DURATION * 1000 for frames in self.gaps]
+            summary += (
+                f"  gaps ms  last {len(gaps)} transitions, "
+                f"avg {sum(gaps) / len(gaps):.0f}, max {max(gaps):.0f}\n"
+            )
+
+        return summary
+
+
+class FrameMonitor:
+    """FrameStats of every guild that has played something, per bot, as
+    bots of one process can play in the same guild."""
+
+    def __init__(self):
+        self.guilds = {}  # (bot ID, guild ID): FrameStats
+
+    def get(self, key):
+        if key not in self.guilds:
+            self.guilds[key] = FrameStats()
+        return self.guilds[key]
+
+    def worst(self, limit):
+        """Gets guilds with the highest share of bad frames.
+
+        Returns:
+            List[Tuple[Tuple[int, int], FrameStats]]: bot and guild IDs
+                with stats, worst first
+        """
+
+        ranked = sorted(
+            self.guilds.items(), key=lambda item: item[1].bad_share
+        )
+        return ranked[::-1][:limit]
+
+
+frame_monitor = FrameMonitor()
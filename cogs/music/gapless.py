@@ -0,0 +1,104 @@
+import threading
+
+import discord
+
+from cogs.music.streaming import SILENCE_FRAME
+
+MAX_GAP_FRAMES = 500  # give up on waiting for next track after 10 seconds
+
+
+class GaplessSource(discord.AudioSource):
+    """Plays the current track and switches to the prepared next track as
+    soon as the current one is exhausted, without stopping the voice client.
+
+    Args:
+        source (cogs.music.source.YTDLSource): track to start with
+        on_transition (Callable[[int], None]): called from the voice thread
+            with the queue index of the track that has just started
+        stats (cogs.music.frame_stats.FrameStats, optional): stats of the
+            guild that count silence frames of each transition. Defaults
+            to None.
+    """
+
+    def __init__(self, source, *, on_transition=None, stats=None):
+        self.current = source
+        self.on_transition = on_transition
+        self.stats = stats
+
+        self.pending = None  # (YTDLSource, queue index)
+        self._lock = threading.Lock()
+
+        self.silence_frames = 0  # silence sent since the last transition
+        self.waiting = False
+
+    @property
+    def volume(self):
+        return self.current.volume
+
+    @volume.setter
+    def volume(self, value):
+        self.current.volume = value
+        with self._lock:
+            if self.pending:
+                self.pending[0].volume = value
+
+    def queue_next(self, source, index):
+        """Sets a track that will follow the current one. Its stream starts
+        buffering right away (see StreamingSource).
+
+        Args:
+            source (cogs.music.source.YTDLSource): next track
+            index (int): position of the track in the player's queue
+        """
+
+        with self._lock:
+            old, self.pending = self.pending, (source, index)
+        if old:
+            old[0].cleanup()
+
+    def clear_next(self):
+        """Drops the prepared track, e.g. when the queue has changed."""
+
+        with self._lock:
+            old, self.pending = self.pending, None
+        if old:
+            old[0].cleanup()
+
+    def read(self):
+        if self.waiting:
+            return self._read_after_transition()
+
+        data = self.current.read()
+        if data:
+            return data
+
+        with self._lock:
+            pending, self.pending = self.pending, None
+        if not pending:
+            return b""
+
+        source, index = pending
+        self.current.cleanup()
+        self.current = source
+        self.waiting = True
+        self.silence_frames = 0
+        if self.on_transition:
+            self.on_transition(index)
+
+        return self._read_after_transition()
+
+    def _read_after_transition(self):
+        if not self.current.original.is_ready():
+            if self.silence_frames < MAX_GAP_FRAMES:
+                self.silence_frames += 1
+                return SILENCE_FRAME
+
+        self.waiting = False
+        if self.stats:
+            self.stats.record_gap(self.silence_frames)
+
+        return self.current.read()
+
+    def cleanup(self):
+        self.clear_next()
+        self.current.cleanup()
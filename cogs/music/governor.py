@@ -0,0 +1,202 @@
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:  # CPU and RSS of ffmpeg processes are not tracked
+    psutil = None
+
+MAX_SESSIONS = 50  # guilds with an active music player
+MAX_FFMPEG = 80  # ffmpeg processes, a player may run 2 (current + next)
+MAX_LOAD = 100  # combined load of running extractions and transcodes
+EXTRACTION_LOAD = 3  # yt-dlp extraction is heavier than one ffmpeg
+FFMPEG_LOAD = 1
+SLOT_TIMEOUT = 30  # seconds to wait for a free slot before giving up
+STUCK_TIMEOUT = 15  # seconds without a frame until ffmpeg gets killed
+MONITOR_INTERVAL = 5
+
+MISSING = object()
+
+
+class CapacityError(Exception):
+    """Raised when the bot runs at its limits and cannot take more work."""
+
+
+class ResourceGovernor:
+    """Caps the amount of voice sessions, ffmpeg processes and the combined
+    extraction and transcoding load of all players in the process.
+
+    Extractions and ffmpeg processes wait for a free slot (up to
+    SLOT_TIMEOUT), new sessions are rejected right away when the bot is
+    full. A monitor thread tracks CPU and RSS of every ffmpeg process and
+    kills the ones that stopped producing frames, so that their
+    StreamingSource restarts them.
+    """
+
+    def __init__(self):
+        self.sessions = set()
+        self.streams = {}  # StreamingSource: discord.FFmpegPCMAudio
+        self.usage = {}  # StreamingSource: (cpu percent, rss in bytes)
+        self.load = 0
+
+        self._cond = threading.Condition()
+        self._processes = {}  # pid: psutil.Process
+        self._monitor = None
+
+    def admit_session(self, session):
+        """Registers a new voice session. Bots running in one process share
+        the limit, so a session is identified by both the bot and guild.
+
+        Args:
+            session (Tuple[int, int]): IDs of the bot and the guild
+
+        Returns:
+            bool: whether the session has been admitted
+        """
+
+        with self._cond:
+            if session in self.sessions:
+                return True
+            if len(self.sessions) >= MAX_SESSIONS:
+                return False
+            self.sessions.add(session)
+
+        return True
+
+    def release_session(self, session):
+        with self._cond:
+            self.sessions.discard(session)
+
+    def _acquire(self, load, condition=lambda: True, timeout=SLOT_TIMEOUT):
+        with self._cond:
+            admitted = self._cond.wait_for(
+                lambda: self.load + load <= MAX_LOAD and condition(),
+                timeout,
+            )
+            if not admitted:
+                raise CapacityError("The bot is under heavy load right now.")
+            self.load += load
+
+    def _release(self, load):
+        with self._cond:
+            self.load -= load
+            self._cond.notify_all()
+
+    def extract(self, func, *args, **kwargs):
+        """Runs a yt-dlp extraction once there is capacity for it.
+
+        Raises:
+            CapacityError: no capacity freed up in SLOT_TIMEOUT seconds
+        """
+
+        self._acquire(EXTRACTION_LOAD)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._release(EXTRACTION_LOAD)
+
+    def acquire_ffmpeg(self, stream):
+        """Reserves a slot for the ffmpeg process of the stream.
+
+        Args:
+            stream (cogs.music.streaming.StreamingSource): stream that is
+                about to spawn ffmpeg
+
+        Raises:
+            CapacityError: no slot freed up in SLOT_TIMEOUT seconds
+        """
+
+        self._acquire(
+            FFMPEG_LOAD, lambda: len(self.streams) < MAX_FFMPEG
+        )
+        with self._cond:
+            self.streams[stream] = None
+
+    def register_ffmpeg(self, stream, ffmpeg):
+        """Starts watching the ffmpeg process spawned in a reserved slot."""
+
+        with self._cond:
+            self.streams[stream] = ffmpeg
+            if self._monitor is None:
+                self._monitor = threading.Thread(
+                    target=self._watch, daemon=True
+                )
+                self._monitor.start()
+
+    def release_ffmpeg(self, stream):
+        with self._cond:
+            if self.streams.pop(stream, MISSING) is MISSING:
+                return
+            self.usage.pop(stream, None)
+        self._release(FFMPEG_LOAD)
+
+    def _watch(self):
+        while True:
+            time.sleep(MONITOR_INTERVAL)
+            with self._cond:
+                streams = list(self.streams.items())
+
+            pids = set()
+            for stream, ffmpeg in streams:
+                process = getattr(ffmpeg, "_process", None)
+                if process is None:
+                    continue
+                pids.add(process.pid)
+                self._measure(stream, process.pid)
+
+                if stream.is_stuck(STUCK_TIMEOUT):
+                    print(f"Killing stuck ffmpeg process {process.pid}.")
+                    stream.restart()
+
+            for pid in set(self._processes) - pids:
+                del self._processes[pid]
+
+    def _measure(self, stream, pid):
+        if psutil is None:
+            return
+
+        try:
+            if pid not in self._processes:
+                self._processes[pid] = psutil.Process(pid)
+            process = self._processes[pid]
+            usage = process.cpu_percent(), process.memory_info().rss
+        except psutil.Error:
+            return
+        with self._cond:
+            if stream in self.streams:
+                self.usage[stream] = usage
+
+    def summary(self):
+        """Describes current usage for the diagnostics command."""
+
+        with self._cond:
+            usage = list(self.usage.values())
+            bitrates = [stream.abr for stream in self.streams if stream.abr]
+            summary = (
+                f"Sessions: {len(self.sessions)}/{MAX_SESSIONS}\n"
+                f"ffmpeg processes: {len(self.streams)}/{MAX_FFMPEG}\n"
+                f"Load: {self.load}/{MAX_LOAD}\n"
+            )
+
+        if usage:
+            cpu = sum(cpu for cpu, _ in usage)
+            rss = sum(rss for _, rss in usage) / 2**20
+            worst_cpu = max(cpu for cpu, _ in usage)
+            summary += (
+                f"ffmpeg CPU: {cpu:.1f}% ({cpu / len(usage):.1f}% per "
+                f"stream, max {worst_cpu:.1f}%), RSS: {rss:.1f} MiB\n"
+            )
+        if bitrates:
+            summary += (
+                f"Input bandwidth: {sum(bitrates):.0f} kbps "
+                f"({sum(bitrates) / len(bitrates):.0f} kbps per stream)\n"
+            )
+
+        if psutil:
+            rss = psutil.Process().memory_info().rss / 2**20
+            summary += f"Bot process RSS: {rss:.1f} MiB\n"
+
+        return summary
+
+
+governor = ResourceGovernor()
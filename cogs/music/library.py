@@ -0,0 +1,264 @@
+import asyncio
+import bisect
+import os
+import re
+import sqlite3
+import threading
+
+try:
+    import mutagen
+except ImportError:  # tracks are titled by file name, without duration
+    mutagen = None
+
+from cogs.music.throttle import ExtractionError
+
+LIBRARY_DIR = os.environ.get("MUSIC_LIBRARY")  # unset: no local library
+INDEX_PATH = os.environ.get("MUSIC_LIBRARY_INDEX", "library.sqlite3")
+URL_PREFIX = "library:"  # webpage_url of a local track is prefix + path
+AUDIO_EXTENSIONS = {
+    ".aac",
+    ".flac",
+    ".m4a",
+    ".mp3",
+    ".ogg",
+    ".opus",
+    ".wav",
+    ".wma",
+}
+MAX_GAIN = 10  # dB, ReplayGain is clamped, quiet tracks aren't blown up
+MAX_RESULTS = 25
+RESCAN_INTERVAL = 10 * 60  # seconds between scans for changed files
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    artist TEXT,
+    album TEXT,
+    duration REAL,
+    gain REAL
+)
+"""
+
+
+def tokenize(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def is_local(url):
+    return url.startswith(URL_PREFIX)
+
+
+def walk(directory):
+    """Yields (path, mtime, size) of audio files under the directory."""
+
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(entry.path)
+            elif os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS:
+                stat = entry.stat()
+                yield entry.path, stat.st_mtime, stat.st_size
+        except OSError:
+            continue
+
+
+def read_tags(path):
+    """Reads title, artist, album, duration and ReplayGain of a file.
+
+    Returns:
+        Tuple[str, str, str, float, float]: missing values are None, title
+            defaults to the file name
+    """
+
+    title = os.path.splitext(os.path.basename(path))[0]
+    artist = album = duration = gain = None
+    if mutagen is None:
+        return title, artist, album, duration, gain
+
+    try:
+        audio = mutagen.File(path, easy=True)
+    except Exception:
+        audio = None
+    if audio is None:
+        return title, artist, album, duration, gain
+
+    def tag(name):
+        values = (audio.tags or {}).get(name)
+        return values[0] if values else None
+
+    title = tag("title") or title
+    artist = tag("artist")
+    album = tag("album")
+    duration = getattr(audio.info, "length", None)
+
+    replaygain = tag("replaygain_track_gain")  # e.g. "-6.52 dB"
+    if replaygain:
+        try:
+            gain = float(replaygain.split()[0])
+        except ValueError:
+            pass
+
+    return title, artist, album, duration, gain
+
+
+class Library:
+    """Local music collection, indexed in sqlite and searched in memory.
+
+    Scans are incremental: only files whose mtime or size changed get
+    their tags read again, so a rescan of an unchanged collection is just
+    a walk over the directory. Every word of titles, artists, albums and
+    file names is kept in an inverted index (token: paths), the last
+    word of a query matches as a prefix over the sorted tokens.
+    """
+
+    def __init__(self, directory=LIBRARY_DIR, index_path=INDEX_PATH):
+        self.directory = directory
+        self.index_path = index_path
+        self.tracks = {}  # path relative to directory: track data
+        self._index = {}  # token: set of paths
+        self._tokens = []  # sorted tokens
+        self._lock = threading.Lock()
+        self.task = None
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    async def run(self, loop):
+        """Rescans the directory periodically in the background."""
+
+        while True:
+            try:
+                updated, removed = await loop.run_in_executor(None, self.scan)
+                if updated or removed:
+                    print(f"Library: {updated} updated, {removed} removed.")
+            except Exception as err:
+                print(f"Library could not be scanned: {err}")
+            await asyncio.sleep(RESCAN_INTERVAL)
+
+    def scan(self):
+        """Brings the sqlite index up to date with the directory and
+        reloads the in-memory index. Blocking, run it in an executor.
+
+        Returns:
+            Tuple[int, int]: amount of updated and removed files
+        """
+
+        with sqlite3.connect(self.index_path) as db:
+            db.execute(SCHEMA)
+            known = {
+                path: (mtime, size)
+                for path, mtime, size in db.execute(
+                    "SELECT path, mtime, size FROM tracks"
+                )
+            }
+
+            updated = 0
+            for path, mtime, size in walk(self.directory):
+                path = os.path.relpath(path, self.directory)
+                if known.pop(path, None) == (mtime, size):
+                    continue
+                full_path = os.path.join(self.directory, path)
+                db.execute(
+                    "INSERT OR REPLACE INTO tracks VALUES (?,?,?,?,?,?,?,?)",
+                    (path, mtime, size, *read_tags(full_path)),
+                )
+                updated += 1
+
+            db.executemany(
+                "DELETE FROM tracks WHERE path = ?", ((p,) for p in known)
+            )
+            rows = db.execute(
+                "SELECT path, title, artist, album, duration, gain "
+                "FROM tracks"
+            ).fetchall()
+
+        self._load(rows)
+        return updated, len(known)
+
+    def _load(self, rows):
+        tracks = {}
+        index = {}
+        for path, title, artist, album, duration, gain in rows:
+            tracks[path] = {
+                "title": f"{artist} - {title}" if artist else title,
+                "webpage_url": URL_PREFIX + path,
+                "duration": duration,
+                "gain": gain,
+            }
+            words = " ".join(filter(None, (title, artist, album, path)))
+            for token in set(tokenize(words)):
+                index.setdefault(token, set()).add(path)
+
+        with self._lock:
+            self.tracks = tracks
+            self._index = index
+            self._tokens = sorted(index)
+
+    def search(self, query, limit=MAX_RESULTS):
+        """Finds tracks matching every word of the query, the last word
+        may be incomplete.
+
+        Args:
+            query (str): search text
+            limit (int, optional): Defaults to MAX_RESULTS.
+
+        Returns:
+            List[Dict]: title, webpage_url, duration and gain of tracks
+        """
+
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            *words, last = tokens
+            matches = [self._index.get(word, set()) for word in words]
+
+            prefixed = set()
+            i = bisect.bisect_left(self._tokens, last)
+            while i < len(self._tokens) and self._tokens[i].startswith(last):
+                prefixed |= self._index[self._tokens[i]]
+                i += 1
+            matches.append(prefixed)
+
+            paths = set.intersection(*sorted(matches, key=len))
+            tracks = [self.tracks[path] for path in paths]
+
+        tracks.sort(key=lambda track: (len(track["title"]), track["title"]))
+        return tracks[:limit]
+
+    def resolve(self, webpage_url):
+        """Gets stream data of a local track, the stream being its file.
+
+        Raises:
+            ExtractionError: the library is disabled or the track is not
+                in it (anymore)
+
+        Returns:
+            Dict: data in the form that resolve_stream gives
+        """
+
+        path = webpage_url[len(URL_PREFIX) :]
+        track = self.tracks.get(path) if self.enabled else None
+        if track is None:
+            raise ExtractionError(f"{path} is not in the music library.")
+        gain = track["gain"]
+
+        return {
+            **track,
+            "url": os.path.join(self.directory, path),
+            "view_count": None,
+            "gain": min(gain, MAX_GAIN) if gain is not None else None,
+        }
+
+
+library = Library()
@@ -1,20 +1,70 @@
 import asyncio
 import functools
+import io
 import json
 import os
 import re
+from datetime import datetime
+from typing import Literal
 
 import discord
 import pandas as pd
 import pytz
-import youtube_dl
 from discord import app_commands
 from discord.ext import commands
 
 import utils
+from cogs.music import scheduler
+from cogs.music.analytics import analytics
+from cogs.music.broadcast import hand_over, is_tuned_in, stations
+from cogs.music.dsp import DSPTransformer
+from cogs.music.frame_stats import frame_monitor
+from cogs.music.governor import CapacityError, governor
+from cogs.music.library import library
 from cogs.music.player import MusicPlayer
-from cogs.music.player_view import SearchView, get_readable_duration
-from cogs.music.source import YTDLSource, ytdl
+from cogs.music.player_view import (
+    PlayerButton,
+    SearchSelect,
+    SearchView,
+    get_readable_duration,
+)
+from cogs.music.recommender import recommender
+from cogs.music.request_log import RequestEvent, request_log
+from cogs.music.source import (
+    YTDLSource,
+    extract_info,
+    extractor,
+    ytdl_flat_pool,
+    ytdl_pool,
+)
+from cogs.music.stats import stats_renderer
+from cogs.music.throttle import ExtractionError
+from cogs.music.title_index import (
+    MAX_CHOICE_LENGTH,
+    MAX_SUGGESTIONS,
+    title_index,
+)
+from cogs.music.watchdog import watchdog
+
+
+MAX_QUERIES = 25  # searches or URLs in one /play
+MAX_PARALLEL_QUERIES = 4  # of them being resolved at once
+EMBED_DESCR_LIMIT = 4096
+EMBED_FIELD_LIMIT = 1024
+RADIO_MSG = "The radio is on here, use /play or /leave first."
+
+
+def join_lines(lines, limit):
+    """Joins lines of text, leaving out the ones that would not fit."""
+
+    text = ""
+    for i, line in enumerate(lines):
+        more = f"\n... and {len(lines) - i} more"
+        if len(text) + len(line) + len(more) + 1 > limit:
+            return text + more
+        text = f"{text}\n{line}" if text else line
+
+    return text
 
 
 def to_thread(func):
@@ -37,6 +87,7 @@ class Music(commands.Cog):
         self.bot = bot
         self.players = {}
         self.timezone = ""
+        self.member_names = {}  # (guild ID, member ID): name
 
     def get_player(self, interaction):
         """Retrieves guild player, or generates one if one does not exist.
@@ -53,9 +104,20 @@ class Music(commands.Cog):
         except KeyError:
             player = MusicPlayer(interaction, self)
             self.players[interaction.guild_id] = player
+        else:
+            if player.loop_task.done():  # should be destroyed by now
+                player.destroy()
+                return self.get_player(interaction)
 
         return player
 
+    def now(self):
+        """Gets current date in the configured timezone, naive like the
+        dates in the requests log."""
+
+        tz_aware_date = datetime.now(pytz.timezone(self.timezone))
+        return tz_aware_date.replace(tzinfo=None)
+
     @to_thread
     def get_ytb_data_from_url(self, inquiry):
         """Gets youtube data from inquiry.
@@ -67,7 +129,7 @@ class Music(commands.Cog):
             Tuple[str, str, str]: duration, views, categories
         """
 
-        data = ytdl.extract_info(url=inquiry, download=False)
+        data = extract_info(inquiry)
 
         # Video/Stream unavailable (uploader/video does not exist, private etc)
         if not data:
@@ -89,37 +151,60 @@ class Music(commands.Cog):
 
         return duration, views, categories
 
+    async def get_member_name(self, guild, member_id):
+        """Gets name of a guild member, fetching each member only once as
+        members are not necessarily cached (see lean mode in main.py).
+
+        Args:
+            guild (discord.Guild): guild of the member
+            member_id (str | int): ID of the member
+
+        Returns:
+            str: name of the member, "UNKNOWN" if they are not found
+        """
+
+        member_id = int(member_id)
+        key = guild.id, member_id
+        if key not in self.member_names:
+            member = guild.get_member(member_id)
+            if member is None:
+                try:
+                    member = await guild.fetch_member(member_id)
+                except discord.errors.NotFound:
+                    member = None
+            self.member_names[key] = member.name if member else "UNKNOWN"
+
+        return self.member_names[key]
+
     async def get_ytb_data_from_embed_req(self, ctx, msg):
-        """Gets youtube data from embedded message.
+        """Gets youtube data from embedded message. Message of /play with
+        more queries has a line for each of them.
 
         Args:
             ctx (discord.ext.commands.context.Context): context (old commands)
             msg (discord.message.Message): discord's message in the chatroom
 
         Returns:
-            Tuple[str, str, str, str]: datetime, author_name, title, webpage_url
+            List[Tuple[str, str, str, str]]: datetime, author_name, title,
+                webpage_url for each queued request
         """
 
+        tz_aware_date = msg.created_at.astimezone(pytz.timezone(self.timezone))
+        datetime = tz_aware_date.strftime("%Y-%m-%d %#H:%M:%S")
+
         # pattern: Queued <song_name> [@<requester>]
         matching_expr = r"Queued \[(.+?)\]\((.+?)\) \[<@!?(\d+)>]"
         msg_descr = msg.embeds[0].description
-        result = re.match(matching_expr, msg_descr)
 
-        title = result[1].replace('"', "'")
-        webpage_url = result[2].replace('"', "'")
-        author_id = result[3]
-        try:
-            author = await ctx.guild.fetch_member(author_id)
-            author_name = author.name
-        except discord.errors.NotFound:
-            author_name = "UNKNOWN"
-
-        tz_aware_date = msg.created_at.astimezone(pytz.timezone(self.timezone))
-        datetime = tz_aware_date.strftime("%Y-%m-%d %#H:%M:%S")
+        recs = []
+        for result in re.finditer(matching_expr, msg_descr):
+            title = result[1].replace('"', "'")
+            webpage_url = result[2].replace('"', "'")
+            author_name = await self.get_member_name(ctx.guild, result[3])
 
-        rec = datetime, author_name, title, webpage_url
+            recs.append((datetime, author_name, title, webpage_url))
 
-        return rec
+        return recs
 
     # Listeners
     @commands.Cog.listener()
@@ -133,6 +218,50 @@ class Music(commands.Cog):
         with open("config.json", encoding="utf-8") as file:
             self.timezone = json.load(file)["timezone"]
 
+        watchdog.start(self.bot.loop)
+
+        async with request_log.lock:
+            if not request_log.loaded:
+                try:
+                    await self.bot.loop.run_in_executor(
+                        None, request_log.load
+                    )
+                except Exception as err:
+                    print(f"Requests log could not be loaded: {err}")
+                title_index.rebuild(request_log.events)
+                recommender.rebuild(request_log.events)
+
+        if analytics.task is None:
+            try:
+                analytics.load()
+            except (OSError, ValueError, KeyError) as err:
+                print(f"Analytics could not be loaded: {err}")
+            analytics.task = self.bot.loop.create_task(
+                analytics.run(self.bot.loop)
+            )
+
+        if library.enabled and library.task is None:
+            library.task = self.bot.loop.create_task(
+                library.run(self.bot.loop)
+            )
+
+        if recommender.task is None:
+            recommender.task = self.bot.loop.create_task(
+                recommender.run(self.bot.loop)
+            )
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        """Destroys the guild's player once the bot leaves voice, whether
+        by /leave, auto-disconnect or being kicked out of the channel."""
+
+        if member.id != self.bot.user.id or after.channel is not None:
+            return
+
+        player = self.players.get(member.guild.id)
+        if player:
+            player.destroy()
+
     # General commands (with no slash)  [!beware to have enough rows!!!]
     @commands.command()
     async def history(self, ctx, limit: int = 1000):
@@ -154,10 +283,10 @@ class Music(commands.Cog):
 
                 i += 1
                 if msg.embeds and msg.embeds[0].description:
-                    if msg.embeds[0].description.startswith("Queued ["):
-                        rec = await self.get_ytb_data_from_embed_req(ctx, msg)
-                        ws_records.append(rec)
-                        print(f"{i}. (new) downloaded: {rec}")
+                    if "Queued [" in msg.embeds[0].description:
+                        recs = await self.get_ytb_data_from_embed_req(ctx, msg)
+                        ws_records.extend(recs)
+                        print(f"{i}. (new) downloaded: {recs}")
 
         wss, _ = utils.get_worksheets("Discord Music Log", ("Commands Log",))
         log_ws = wss[0]
@@ -165,6 +294,141 @@ class Music(commands.Cog):
 
         await ctx.send("___Messages saved up to this point.___")
 
+    @commands.command()
+    @commands.is_owner()
+    async def resources(self, ctx):
+        """Shows usage of the limited resources shared by all players.
+
+        Args:
+            ctx (discord.ext.commands.context.Context): context (old commands)
+        """
+
+        summary = (
+            f"Players: {len(self.players)}\n"
+            f"{governor.summary()}"
+            f"YoutubeDL: {ytdl_pool.summary()}\n"
+            f"YoutubeDL (flat): {ytdl_flat_pool.summary()}\n"
+            f"{extractor.summary()}{watchdog.summary()}"
+        )
+        if scheduler.audio_scheduler:
+            summary += scheduler.audio_scheduler.summary()
+        await ctx.send(f"```ml\n{summary}```")
+
+    @commands.command()
+    @commands.is_owner()
+    async def frames(self, ctx, limit: int = 5):
+        """Shows guilds whose audio had the most late or silent frames.
+
+        Args:
+            ctx (discord.ext.commands.context.Context): context (old commands)
+            limit (int, optional): amount of guilds. Defaults to 5.
+        """
+
+        lines = []
+        for (bot_id, guild_id), stats in frame_monitor.worst(limit):
+            guild = self.bot.get_guild(guild_id)
+            name = guild.name if guild else guild_id
+            bot = "" if bot_id == self.bot.user.id else f" (bot {bot_id})"
+            lines.append(f"{name}{bot}: {stats.summary()}")
+
+        summary = join_lines(lines, 1900) or "Nothing has been played yet."
+        await ctx.send(f"```ml\n{summary}```")
+
+    @commands.command()
+    @commands.is_owner()
+    async def stalls(self, ctx):
+        """Shows what was running when the event loop got blocked recently.
+
+        Args:
+            ctx (discord.ext.commands.context.Context): context (old commands)
+        """
+
+        if not watchdog.stalls:
+            await ctx.send("The event loop has not been blocked.")
+            return
+
+        for stall in list(watchdog.stalls)[-3:]:
+            header = (
+                f"{stall.date:%Y-%m-%d %H:%M:%S} {stall.task} "
+                f"blocked for {stall.lag:.2f}s+\n"
+            )
+            stack = stall.stack[-(1900 - len(header)) :]
+            await ctx.send(f"```py\n{header}{stack}```")
+
+    @app_commands.command(name="top")
+    async def top(
+        self,
+        interaction,
+        period: Literal["day", "week", "month"] = "week",
+    ):
+        """Shows the most requested tracks and most active requesters.
+
+        Args:
+            period: str
+                How far back the requests are counted.
+        """
+
+        tracks, requesters = analytics.top(interaction.guild_id, period)
+        if not tracks:
+            msg = f"Nothing has been requested in the last {period}."
+            await interaction.response.send_message(msg)
+            return
+
+        track_lines = [
+            f"{i}. [{title}]({url}) ({count}x)"
+            if url.startswith("http")
+            else f"{i}. {title} ({count}x)"
+            for i, (title, url, count) in enumerate(tracks, 1)
+        ]
+        requester_lines = [
+            f"{i}. {name} ({count}x)"
+            for i, (name, count) in enumerate(requesters, 1)
+        ]
+
+        embed = discord.Embed(
+            title=f"Top of the last {period}", color=discord.Color.green()
+        )
+        embed.add_field(
+            name="Tracks",
+            value=join_lines(track_lines, EMBED_FIELD_LIMIT),
+            inline=False,
+        )
+        embed.add_field(
+            name="Requesters",
+            value=join_lines(requester_lines, EMBED_FIELD_LIMIT),
+            inline=False,
+        )
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="stats")
+    async def stats(
+        self,
+        interaction,
+        period: Literal["week", "month", "year", "lifetime"] = "month",
+    ):
+        """Shows top requesters, top tracks and requests over time.
+
+        Args:
+            period: str
+                How far back the requests are taken into account.
+        """
+
+        await interaction.response.defer()
+
+        try:
+            leaderboard, timeline = await stats_renderer.render(
+                period, self.now(), self.bot.loop
+            )
+        except Exception as err:
+            await interaction.followup.send(f"Stats could not be made: {err}")
+            return
+
+        files = [
+            discord.File(io.BytesIO(leaderboard), "leaderboard.png"),
+            discord.File(io.BytesIO(timeline), "timeline.png"),
+        ]
+        await interaction.followup.send(files=files)
+
     # ! TODO commit till this line!
     @commands.command()
     async def create_stats(self, ctx):
@@ -281,31 +545,76 @@ class Music(commands.Cog):
 
     # Slash commands, the main command
     @app_commands.command(name="play")
-    async def _play(self, interaction, *, search: str):
-        """Request a song and add it to the queue.
+    async def _play(
+        self,
+        interaction,
+        *,
+        search: str = "",
+        file: discord.Attachment = None,
+    ):
+        """Request songs and add them to the queue.
 
         This command attempts to join valid voice channel if the bot is not
-        already in one. Uses YTDL to automatically search, retrieves a song
-        and streams it.
+        already in one. Uses YTDL to automatically search, retrieves songs
+        and streams them.
 
         Args:
-            search: str [Required]
+            search: str [Optional]
                 The song to search and retrieve using YTDL.
                 This could be a simple search, an ID or URL.
+                More of them can be separated by ';'.
+            file: discord.Attachment [Optional]
+                Text file with a search or URL on each line.
         """
 
-        await self.play(interaction, search)
+        queries = search.split(";")
+        if file:
+            content = await file.read()
+            queries += content.decode("utf-8", errors="ignore").splitlines()
+
+        await self.play(interaction, *queries)
 
-    async def play(self, interaction, search):
-        # TODO: Why we have two play functions? Explain
-        # TODO: Pylint, Documentation
+    @_play.autocomplete("search")
+    async def play_autocomplete(self, interaction, current: str):
+        """Suggests tracks of the local library and previously requested
+        tracks matching the typed text."""
+
+        local = [
+            (track["title"], track["webpage_url"])
+            for track in library.search(current)
+            if len(track["webpage_url"]) <= MAX_CHOICE_LENGTH
+        ]
+        suggestions = (local + title_index.search(current))[:MAX_SUGGESTIONS]
+
+        return [
+            app_commands.Choice(name=title[:MAX_CHOICE_LENGTH], value=url)
+            for title, url in suggestions
+        ]
+
+    async def play(self, interaction, *queries):
+        """Resolves the queries concurrently and queues their tracks in the
+        original order. Playback starts as soon as the first one is ready.
+
+        Args:
+            interaction (discord.interaction.Interaction): slash cmd context
+            queries (str): searches, URLs or playlist URLs
+        """
+
+        queries = [query.strip() for query in queries if query.strip()]
+        if not queries:
+            msg = "Tell me what to play, or attach a file with songs."
+            await interaction.response.send_message(msg)
+            return
+        ignored = len(queries) - MAX_QUERIES
+        queries = queries[:MAX_QUERIES]
 
         # making sure interaction timeout does not expire
         msg = "...Looking for song(s)... wait..."
         await interaction.response.send_message(msg)
 
-        # voice channel check and connect
+        # voice channel check
         vc = interaction.guild.voice_client
+        user_channel = None
         if not vc:
             try:
                 user_channel = interaction.user.voice.channel
@@ -314,22 +623,82 @@ class Music(commands.Cog):
                 await interaction.followup.send(msg)
                 return
 
-            await user_channel.connect()
-
-        # getting source entries ready to be played
-        try:
-            entries = await YTDLSource.create_source(
-                interaction, search, loop=self.bot.loop
-            )
-        except youtube_dl.utils.DownloadError as err:
-            await interaction.followup.send(err)
+        session = self.bot.user.id, interaction.guild_id
+        if not governor.admit_session(session):
+            msg = "Too many servers are listening right now, try it later."
+            await interaction.followup.send(msg)
             return
 
-        # getting the player, if it doesnt play anything, send signal to play
+        if user_channel:
+            try:
+                await user_channel.connect()
+            except Exception as err:  # timeout, ClientException
+                # the session is released by the player, if there is one
+                if interaction.guild_id not in self.players:
+                    governor.release_session(session)
+                msg = f"Could not connect to the voice channel: {err}"
+                await interaction.followup.send(msg)
+                return
+        elif is_tuned_in(vc):
+            hand_over(vc)  # the queue takes over from the radio
+
+        # getting source entries ready to be played, in parallel
+        semaphore = asyncio.Semaphore(MAX_PARALLEL_QUERIES)
+
+        async def create_source(query):
+            async with semaphore:
+                return await YTDLSource.create_source(
+                    query, loop=self.bot.loop
+                )
+
+        tasks = [
+            self.bot.loop.create_task(create_source(query))
+            for query in queries
+        ]
+
+        # queue them in original order as soon as they (and ones before) are
         player = self.get_player(interaction)
-        send_signal = (
-            True if player.next_pointer >= len(player.queue) else False
+        descriptions = []
+        if ignored > 0:
+            descriptions.append(
+                f"Only the first {MAX_QUERIES} are queued, "
+                f"{ignored} more ignored."
+            )
+        for query, task in zip(queries, tasks):
+            try:
+                data = await task
+            except (ExtractionError, CapacityError) as err:
+                descriptions.append(f"Could not queue `{query}`: {err}")
+                continue
+            except Exception as err:  # the other queries still get queued
+                print(f"Query {query} failed: {err!r}")
+                descriptions.append(f"Could not queue `{query}`.")
+                continue
+
+            self.queue_entries(interaction, player, data["entries"])
+            titled_url = f"[{data['title']}]({data['webpage_url']})"
+            descriptions.append(
+                f"Queued {titled_url} [{interaction.user.mention}]"
+            )
+
+        await interaction.followup.send(
+            embed=discord.Embed(
+                title="",
+                description=join_lines(descriptions, EMBED_DESCR_LIMIT),
+                color=discord.Color.green(),
+            )
         )
+
+        if player.np_msg and player.view:
+            player.view.update_msg()
+            await player.update_player_status_message()
+
+    def queue_entries(self, interaction, player, entries):
+        """Adds entries into the queue, if the player doesn't play anything,
+        it gets a signal to play."""
+
+        send_signal = player.next_pointer >= len(player.queue)
+        date = self.now()
         for entry in entries:
             source = {
                 "webpage_url": entry["webpage_url"],
@@ -337,14 +706,19 @@ class Music(commands.Cog):
                 "title": entry["title"],
             }
             player.queue.append(source)
+            request_log.add(
+                RequestEvent(
+                    date,
+                    interaction.user.name,
+                    entry["title"],
+                    entry["webpage_url"],
+                    interaction.guild_id,
+                )
+            )
+        player.reset_preload()
 
         if send_signal:
-            # print("SIGNAL FROM MUSIC.PY")
             player.next.set()
-            # print("SIGNALED FROM MUSIC.PY")
-        elif player.np_msg:
-            player.view.update_msg()
-            await player.update_player_status_message()
 
     # TODO: Update view?
     @app_commands.command(name="volume")
@@ -356,6 +730,20 @@ class Music(commands.Cog):
                 The volume to set the player to in percentage. (1-100)
         """
 
+        vc = interaction.guild.voice_client
+        if is_tuned_in(vc):
+            # the radio has no player, only its own volume
+            if volume is None:
+                volume = round(vc.source.volume * 100)
+                msg = f"The radio volume is currently at **{volume}%**."
+                return await interaction.response.send_message(msg)
+            if not 0 < volume < 101:
+                msg = "Please enter a value between 1 and 100."
+                return await interaction.response.send_message(msg)
+            vc.source.volume = volume / 100
+            msg = f"The radio volume has been set to **{volume}%**."
+            return await interaction.response.send_message(msg)
+
         player = self.get_player(interaction)
         if volume is None:
             msg = f"The volume is currently at **{int(player.volume*100)}%**."
@@ -364,7 +752,6 @@ class Music(commands.Cog):
             msg = "Please enter a value between 1 and 100."
             return await interaction.response.send_message(msg)
 
-        vc = interaction.guild.voice_client
         if vc and vc.is_connected() and vc.source:
             vc.source.volume = volume / 100
 
@@ -379,6 +766,173 @@ class Music(commands.Cog):
         )
         await interaction.response.send_message(embed=embed)
 
+    @app_commands.command(name="radio")
+    async def radio(self, interaction, url: str):
+        """Tunes in to a station: a live stream or playlist that plays in
+        sync in every server tuned in to it, decoded only once for all.
+
+        Args:
+            url: str
+                URL of the live stream, track or playlist.
+        """
+
+        if interaction.guild_id in self.players:
+            msg = "Music is playing here, use /leave first."
+            return await interaction.response.send_message(msg)
+
+        await interaction.response.send_message("...Tuning in... wait...")
+
+        # voice channel check
+        vc = interaction.guild.voice_client
+        user_channel = None
+        if not vc:
+            try:
+                user_channel = interaction.user.voice.channel
+            except AttributeError:
+                msg = "Neither bot or you are connected to voice channel."
+                return await interaction.followup.send(msg)
+
+        # counted like a player, the listener releases it once it stops
+        session = self.bot.user.id, interaction.guild_id
+        if not governor.admit_session(session):
+            msg = "Too many servers are listening right now, try it later."
+            return await interaction.followup.send(msg)
+        # already tuned in, the session stays with the playing listener
+        owned = is_tuned_in(vc)
+
+        if user_channel:
+            try:
+                vc = await user_channel.connect()
+            except Exception as err:  # timeout, ClientException
+                governor.release_session(session)
+                msg = f"Could not connect to the voice channel: {err}"
+                return await interaction.followup.send(msg)
+
+        # tracks are only extracted to start the station, not to join it
+        listener = stations.tune_in(url, ())
+        if listener is None:
+            try:
+                data = await YTDLSource.create_source(url, loop=self.bot.loop)
+            except (ExtractionError, CapacityError) as err:
+                if not owned:
+                    governor.release_session(session)
+                return await interaction.followup.send(err)
+            listener = stations.tune_in(url, data["entries"])
+        if listener is None:  # e.g. an empty playlist
+            if not owned:
+                governor.release_session(session)
+            return await interaction.followup.send("Nothing to play found.")
+
+        if is_tuned_in(vc):
+            hand_over(vc)
+        elif vc.is_playing() or vc.is_paused():
+            vc.stop()
+        listener.on_leave = functools.partial(
+            governor.release_session, session
+        )
+        scheduler.play(vc, DSPTransformer(listener, volume=0.1))
+
+        broadcast = listener.broadcast
+        embed = discord.Embed(
+            description=(
+                f"Tuned in to **{broadcast.title}**, "
+                f"{len(broadcast.listeners)} server(s) listening."
+            ),
+            color=discord.Color.green(),
+        )
+        await interaction.followup.send(embed=embed)
+
+    @app_commands.command(name="autoplay")
+    async def autoplay(self, interaction):
+        """Toggles adding related tracks when the queue runs out."""
+
+        if is_tuned_in(interaction.guild.voice_client):
+            return await interaction.response.send_message(RADIO_MSG)
+
+        player = self.get_player(interaction)
+        player.toggle_autoplay()
+
+        state = "on" if player.autoplay else "off"
+        embed = discord.Embed(
+            description=f"Autoplay has been turned **{state}**.",
+            color=discord.Color.green(),
+        )
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="equalizer")
+    async def equalizer(self, interaction, bass: int = 0, treble: int = 0):
+        """Boosts or cuts bass and treble of the player.
+
+        Args:
+            bass: int
+                Gain of frequencies below ~1.5 kHz in dB. (-12 to 12)
+            treble: int
+                Gain of frequencies above ~1.5 kHz in dB. (-12 to 12)
+        """
+
+        if not -12 <= bass <= 12 or not -12 <= treble <= 12:
+            msg = "Please enter values between -12 and 12 dB."
+            return await interaction.response.send_message(msg)
+
+        if is_tuned_in(interaction.guild.voice_client):
+            return await interaction.response.send_message(RADIO_MSG)
+
+        player = self.get_player(interaction)
+        player.set_equalizer(bass, treble)
+
+        descr = f"Equalizer set to bass **{bass:+} dB**, "
+        descr += f"treble **{treble:+} dB**."
+        embed = discord.Embed(
+            description=descr,
+            color=discord.Color.green(),
+        )
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="filter")
+    async def filter_(
+        self,
+        interaction,
+        name: Literal[
+            "bassboost",
+            "nightcore",
+            "vaporwave",
+            "speed",
+            "mono",
+            "8d",
+            "clear",
+        ],
+    ):
+        """Toggles an audio filter, applied right away to the playing track.
+
+        Args:
+            name: str
+                Filter to turn on or off, 'clear' turns all of them off.
+        """
+
+        vc = interaction.guild.voice_client
+        if not vc or not vc.is_connected():
+            msg = "I'm not connected to a voice channel."
+            return await interaction.response.send_message(msg)
+        if is_tuned_in(vc):
+            return await interaction.response.send_message(RADIO_MSG)
+
+        player = self.get_player(interaction)
+        if name == "clear":
+            player.clear_filters()
+        else:
+            player.toggle_filter(name)
+
+        filters = ", ".join(player.filters) or "none"
+        embed = discord.Embed(
+            description=f"Active filters: **{filters}**.",
+            color=discord.Color.green(),
+        )
+        await interaction.response.send_message(embed=embed)
+
+        if player.view:
+            player.view.update_msg()
+            await player.update_player_status_message()
+
     # Invoked commands with voice check
     @app_commands.command()
     async def jump(self, interaction, index: int):
@@ -388,6 +942,8 @@ class Music(commands.Cog):
         if not vc or not vc.is_connected():
             msg = "I'm not connected to a voice channel."
             return await interaction.response.send_message(msg)
+        if is_tuned_in(vc):
+            return await interaction.response.send_message(RADIO_MSG)
 
         player = self.get_player(interaction)
         if not player.queue:
@@ -398,6 +954,7 @@ class Music(commands.Cog):
             return await interaction.response.send_message(msg)
 
         player.next_pointer = index - 2
+        player.reset_preload()
 
         descr = f"Jumped to a {index}. song. "
         descr += "It will be played after current one finishes."
@@ -415,6 +972,8 @@ class Music(commands.Cog):
         if not vc or not vc.is_connected():
             msg = "I'm not connected to a voice channel."
             return await interaction.response.send_message(msg)
+        if is_tuned_in(vc):
+            return await interaction.response.send_message(RADIO_MSG)
 
         player = self.get_player(interaction)
         if not player.queue:
@@ -432,6 +991,7 @@ class Music(commands.Cog):
             player.next_pointer -= 1
         if index - 1 <= player.current_pointer:
             player.current_pointer -= 1
+        player.reset_preload()
 
         descr = f"Removed {index}. song [{s['title']}]({s['webpage_url']})."
         embed = discord.Embed(
@@ -448,6 +1008,8 @@ class Music(commands.Cog):
         if not vc or not vc.is_connected():
             msg = "I'm not connected to a voice channel."
             return await interaction.response.send_message(msg)
+        if is_tuned_in(vc):
+            return await interaction.response.send_message(RADIO_MSG)
 
         player = self.get_player(interaction)
         if not player.queue:
@@ -457,6 +1019,7 @@ class Music(commands.Cog):
         player.queue.clear()
         player.current_pointer = 0
         player.next_pointer = -1
+        player.reset_preload()
         vc.stop()
 
         embed = discord.Embed(
@@ -465,7 +1028,6 @@ class Music(commands.Cog):
         )
         await interaction.response.send_message(embed=embed)
 
-    # duration view does not work according to it!
     @app_commands.command()
     async def seek(self, interaction, second: int = 0):
         """Goes to a specific timestamp of currently played track."""
@@ -474,15 +1036,15 @@ class Music(commands.Cog):
         if not vc or not vc.is_connected():
             msg = "I'm not connected to a voice channel."
             return await interaction.response.send_message(msg)
+        if is_tuned_in(vc):
+            return await interaction.response.send_message(RADIO_MSG)
 
         player = self.get_player(interaction)
         if vc.is_paused() or not vc.is_playing():
             msg = "There is no song being played."
             return await interaction.response.send_message(msg)
 
-        player.timestamp = second
-        player.next_pointer -= 1
-        vc.stop()
+        player.seek(second)
 
         embed = discord.Embed(
             description="Track has been seeked.",
@@ -503,13 +1065,12 @@ class Music(commands.Cog):
             entries = await YTDLSource.search_source(
                 search, loop=self.bot.loop
             )
-        except youtube_dl.utils.DownloadError as err:
+        except (ExtractionError, CapacityError) as err:
             await interaction.followup.send(err)
             return
 
         # load it into view
-        player = self.get_player(interaction)
-        view = SearchView(player, entries)
+        view = SearchView(interaction.guild_id, entries)
         await interaction.channel.send(view.msg, view=view)
 
     @app_commands.command(name="pick_from_playlist")
@@ -523,16 +1084,14 @@ class Music(commands.Cog):
 
         # get entries
         try:
-            entries = await YTDLSource.create_source(
-                interaction, search, loop=self.bot.loop, playlist=True
-            )
-        except youtube_dl.utils.DownloadError as err:
+            data = await YTDLSource.create_source(search, loop=self.bot.loop)
+        except (ExtractionError, CapacityError) as err:
             await interaction.followup.send(err)
             return
+        entries = data["entries"]
 
         # load it into view
-        player = self.get_player(interaction)
-        view = SearchView(player, entries)
+        view = SearchView(interaction.guild_id, entries)
         await interaction.channel.send(view.msg, view=view)
 
     # Button commands
@@ -570,16 +1129,25 @@ class Music(commands.Cog):
         vc.stop()
 
     async def shuffle(self, interaction):
+        if is_tuned_in(interaction.guild.voice_client):
+            return
         player = self.get_player(interaction)
         player.shuffle()
+        player.reset_preload()
 
     async def loop_queue(self, interaction):
+        if is_tuned_in(interaction.guild.voice_client):
+            return
         player = self.get_player(interaction)
         player.toggle_loop_queue()
+        player.reset_preload()
 
     async def loop_track(self, interaction):
+        if is_tuned_in(interaction.guild.voice_client):
+            return
         player = self.get_player(interaction)
         player.toggle_loop_track()
+        player.reset_preload()
 
 
 async def setup(bot):
@@ -590,6 +1158,7 @@ async def setup(bot):
         bot (__main__.MyBot): bot instance initialized in the main function
     """
 
+    bot.add_dynamic_items(PlayerButton, SearchSelect)
     await bot.add_cog(
         Music(bot), guilds=[discord.Object(id=os.environ["SERVER_ID"])]
     )
@@ -1,11 +1,24 @@
 import asyncio
+import functools
 import random
-import time
 
 from discord.errors import ClientException
 
+from cogs.music import scheduler
+from cogs.music.frame_stats import frame_monitor
+from cogs.music.gapless import GaplessSource
+from cogs.music.governor import CapacityError, governor
 from cogs.music.player_view import PlayerView
-from cogs.music.source import YTDLSource
+from cogs.music.recommender import recommender
+from cogs.music.source import YTDLSource, resolve_stream
+from cogs.music.stream_cache import EXPIRY_MARGIN, stream_cache
+from cogs.music.throttle import ExtractionError
+
+PRELOAD_SECONDS = 10  # how long before the end the next track is prepared
+REFRESH_INTERVAL = 60  # how often stream URLs of upcoming tracks are checked
+REFRESH_AHEAD = 2  # amount of upcoming tracks that are kept resolved
+IDLE_TIMEOUT = 300  # seconds with nothing to play before the player leaves
+AUTOPLAY_HISTORY = 50  # recently queued tracks that autoplay won't repeat
 
 
 class MusicPlayer:
@@ -24,17 +37,32 @@ class MusicPlayer:
 
         self.np_msg = None
         self.volume = 0.1
+        self.bass = 0  # EQ gains in dB
+        self.treble = 0
+        self.filters = []  # names of ffmpeg audio filters
         self.current_pointer = 0
         self.next_pointer = -1
         self.loop_queue = False
         self.loop_track = False
-
-        self.timestamp = 0
+        self.autoplay = False
 
         self.view = None
         self.workaround = 1
+        self.failures = 0  # tracks in a row that could not be played
+
+        self.gapless = None
+        self.preload_task = None
+        self.frame_stats = frame_monitor.get(
+            (interaction.client.user.id, interaction.guild_id)
+        )
 
-        interaction.client.loop.create_task(self.player_loop())
+        self.loop_task = interaction.client.loop.create_task(
+            self.player_loop()
+        )
+        self.loop_task.add_done_callback(lambda _: self.destroy())
+        self.refresh_task = interaction.client.loop.create_task(
+            self.refresh_streams()
+        )
 
     async def player_loop(self):
         """Our main player loop."""
@@ -51,19 +79,14 @@ class MusicPlayer:
                     if self.loop_queue:
                         self.next_pointer = 0  # queue loop
                     else:
-                        await self.next.wait()
+                        await asyncio.wait_for(self.next.wait(), IDLE_TIMEOUT)
                         self.next.clear()
 
                 self.current_pointer = self.next_pointer
                 source = self.queue[self.current_pointer]
 
-            # used to be implemented with destroy, cleanup, it is in main f.
+            # nothing to play for a while, destroy() disconnects
             except (IndexError, asyncio.TimeoutError):
-                guild = self.interaction.guild
-                try:
-                    await guild.voice_client.disconnect()
-                except AttributeError:
-                    pass
                 return
 
             try:
@@ -72,17 +95,29 @@ class MusicPlayer:
                         re_source = await YTDLSource.regather_stream(
                             source,
                             loop=self.interaction.client.loop,
-                            timestamp=self.timestamp,
+                            filters=self.filters,
+                            stats=self.frame_stats,
+                            bitrate=self.channel_bitrate(),
+                            volume=self.volume,
                         )
-                        self.timestamp = 0  # Why
-                    re_source.volume = self.volume
+                    self.apply_audio_settings(re_source)
 
                     self.workaround = 0     # it simply skips this (one song)
-                    self.interaction.guild.voice_client.play(re_source,
-                        after=self.play_next_song
+                    self.gapless = GaplessSource(
+                        re_source,
+                        on_transition=self.on_transition,
+                        stats=self.frame_stats,
+                    )
+                    scheduler.play(
+                        self.interaction.guild.voice_client,
+                        self.gapless,
+                        after=self.play_next_song,
                     )
-                    time.sleep(1)
+                    await asyncio.sleep(1)
 
+            except (ExtractionError, CapacityError) as err:
+                await self.skip_failed(source, err)
+                continue
             except (ClientException, AttributeError) as err:
                 print(f"ClientException: {err}")
                 return
@@ -95,18 +130,254 @@ class MusicPlayer:
                 await self.interaction.channel.send(msg)
                 return
 
+            self.failures = 0
             self.next.clear()
             self.view = PlayerView(self, re_source)
+            self.fill_autoplay()
             await self.update_player_status_message()
+            self.reset_preload()
 
             await self.next.wait()
 
+    async def skip_failed(self, source, err):
+        """Tells that a track cannot be played (unavailable, throttled, no
+        capacity), the player goes on with the next one. Looping stops
+        once it would only repeat tracks that fail."""
+
+        msg = f"Could not play `{source['title']}`, skipping it: {err}"
+        self.failures += 1
+        if self.loop_track:
+            self.loop_track = False
+            msg += "\nTrack loop has been turned off."
+        if self.loop_queue and self.failures >= len(self.queue):
+            self.loop_queue = False
+            msg += "\nQueue loop has been turned off."
+        await self.interaction.channel.send(msg)
+
+    def destroy(self):
+        """Tears down everything the player holds: its tasks, ffmpeg
+        processes, view and voice connection, and evicts it from players.
+        Called once the player loop ends, for whatever reason."""
+
+        guild = self.interaction.guild
+        if self.music.players.get(guild.id) is self:
+            del self.music.players[guild.id]
+        governor.release_session((self.music.bot.user.id, guild.id))
+
+        current_task = asyncio.current_task()
+        for task in (self.loop_task, self.preload_task, self.refresh_task):
+            if task and task is not current_task:
+                task.cancel()
+
+        if self.gapless:
+            self.gapless.cleanup()
+            self.gapless = None
+        if self.view:
+            self.view.stop()
+            self.view = None
+        self.queue.clear()
+        self.np_msg = None
+
+        if guild.voice_client:
+            self.interaction.client.loop.create_task(
+                guild.voice_client.disconnect(force=True)
+            )
+
     def play_next_song(self, error=None):
         if error:
             pass
         self.workaround = 1
         self.next.set()
 
+    def apply_audio_settings(self, source):
+        """Sets volume and EQ of the player to the track's DSP stage."""
+
+        source.volume = self.volume
+        source.bass = self.bass
+        source.treble = self.treble
+
+    def set_equalizer(self, bass, treble):
+        """Changes EQ of the playing and the prepared track right away."""
+
+        self.bass, self.treble = bass, treble
+        if self.gapless:
+            self.apply_audio_settings(self.gapless.current)
+            pending = self.gapless.pending
+            if pending:
+                self.apply_audio_settings(pending[0])
+
+    def toggle_filter(self, name):
+        """Adds the audio filter to the chain, or removes it if present."""
+
+        if name in self.filters:
+            self.filters.remove(name)
+        else:
+            self.filters.append(name)
+        self.apply_filters()
+
+    def clear_filters(self):
+        self.filters.clear()
+        self.apply_filters()
+
+    def apply_filters(self):
+        """Restarts ffmpeg of the playing and the prepared track with the
+        new filter chain, on their already resolved stream URLs."""
+
+        if not self.gapless:
+            return
+
+        self.gapless.current.set_filters(self.filters)
+        pending = self.gapless.pending
+        if pending:
+            pending[0].set_filters(self.filters)
+
+    def seek(self, timestamp):
+        """Moves the currently playing track to the timestamp.
+
+        Args:
+            timestamp (int): position in seconds
+        """
+
+        self.gapless.current.seek(timestamp)
+        self.reset_preload()
+
+    def upcoming_pointer(self):
+        """Index of the track that follows the current one, if there is any."""
+
+        if self.loop_track:
+            pointer = self.next_pointer
+        else:
+            pointer = self.next_pointer + 1
+        if pointer >= len(self.queue):
+            pointer = 0 if self.loop_queue else -1
+
+        return pointer if 0 <= pointer < len(self.queue) else None
+
+    def channel_bitrate(self):
+        """Bitrate of the voice channel in kbps, None if not connected."""
+
+        vc = self.interaction.guild.voice_client
+        if not vc or not vc.channel:
+            return None
+        return vc.channel.bitrate // 1000
+
+    def reset_preload(self):
+        """Drops the prepared next track and prepares it again.
+        Needs to be called whenever the queue or its pointers change."""
+
+        if self.preload_task:
+            self.preload_task.cancel()
+            self.preload_task = None
+        if not self.gapless:
+            return
+
+        self.gapless.clear_next()
+        self.preload_task = self.interaction.client.loop.create_task(
+            self.preload_next(self.gapless)
+        )
+
+    async def preload_next(self, gapless):
+        """Starts ffmpeg for the upcoming track shortly before the current
+        one ends, so that GaplessSource can switch to it without a gap."""
+
+        while gapless is self.gapless:
+            current = gapless.current
+            remaining = (current.duration or 0) - current.position
+            if remaining <= PRELOAD_SECONDS:
+                break
+            await asyncio.sleep(min(remaining - PRELOAD_SECONDS, 5))
+        else:
+            return
+
+        pointer = self.upcoming_pointer()
+        if pointer is None:
+            return
+
+        try:
+            source = await YTDLSource.regather_stream(
+                self.queue[pointer],
+                loop=self.interaction.client.loop,
+                filters=self.filters,
+                stats=self.frame_stats,
+                bitrate=self.channel_bitrate(),
+                volume=self.volume,
+            )
+        except Exception as err:
+            print(f"Preloading failed, next track starts normally: {err}")
+            return
+
+        # queue could have changed while the stream was being regathered
+        if gapless is not self.gapless or pointer != self.upcoming_pointer():
+            source.cleanup()
+            return
+
+        self.apply_audio_settings(source)
+        gapless.queue_next(source, pointer)
+
+    def upcoming_urls(self):
+        """Webpage URLs of the current track and the ones that follow it."""
+
+        urls = []
+        if self.gapless:
+            urls.append(self.gapless.current.webpage_url)
+
+        pointer = self.next_pointer
+        for _ in range(REFRESH_AHEAD):
+            pointer += 1
+            if pointer >= len(self.queue):
+                if not self.loop_queue:
+                    break
+                pointer = 0
+            if 0 <= pointer < len(self.queue):
+                urls.append(self.queue[pointer]["webpage_url"])
+
+        return list(dict.fromkeys(urls))
+
+    async def refresh_streams(self):
+        """Re-resolves stream URLs of the current and upcoming tracks in the
+        background before they expire, so that neither the next track nor
+        a loop of the current one has to wait for an extraction."""
+
+        loop = self.interaction.client.loop
+        while True:
+            await asyncio.sleep(REFRESH_INTERVAL)
+
+            for webpage_url in self.upcoming_urls():
+                expires_in = stream_cache.expires_in(webpage_url)
+                if expires_in > EXPIRY_MARGIN + REFRESH_INTERVAL:
+                    continue
+
+                to_run = functools.partial(
+                    resolve_stream,
+                    webpage_url,
+                    refresh=True,
+                    bitrate=self.channel_bitrate(),
+                )
+                try:
+                    data = await loop.run_in_executor(None, to_run)
+                except Exception as err:
+                    print(f"Refreshing stream of {webpage_url} failed: {err}")
+                    continue
+
+                current = self.gapless.current if self.gapless else None
+                if current and current.webpage_url == webpage_url:
+                    current.stream_url = data["url"]
+
+    def on_transition(self, pointer):
+        """Called from the voice thread once GaplessSource switched tracks."""
+
+        self.interaction.client.loop.call_soon_threadsafe(
+            self.interaction.client.loop.create_task,
+            self.transitioned(pointer),
+        )
+
+    async def transitioned(self, pointer):
+        self.current_pointer = self.next_pointer = pointer
+        self.fill_autoplay()
+        self.view = PlayerView(self, self.gapless.current)
+        await self.update_player_status_message()
+        self.reset_preload()
+
     async def update_player_status_message(self):
         # if no np.msg, create new msg
         if not self.np_msg:
@@ -146,6 +417,39 @@ class MusicPlayer:
 
         self.loop_queue = not self.loop_queue
 
+    def toggle_autoplay(self):
+        """Toggles appending related tracks when the queue runs out."""
+
+        self.autoplay = not self.autoplay
+        self.fill_autoplay()
+        self.reset_preload()
+
+    def fill_autoplay(self):
+        """Appends a track related to the current one if there is nothing
+        to play after it. The pick is an in-memory lookup (Recommender)."""
+
+        if not self.autoplay or not self.queue:
+            return
+        if self.upcoming_pointer() is not None:
+            return
+
+        current = self.queue[self.current_pointer]
+        recent = {
+            track["webpage_url"] for track in self.queue[-AUTOPLAY_HISTORY:]
+        }
+        pick = recommender.recommend(current["webpage_url"], exclude=recent)
+        if not pick:
+            return
+
+        title, webpage_url = pick
+        self.queue.append(
+            {
+                "webpage_url": webpage_url,
+                "requester": "autoplay",
+                "title": title,
+            }
+        )
+
     def toggle_loop_track(self):
         """Loops the currently playing track."""
 
@@ -1,7 +1,6 @@
-from timeit import default_timer
+from discord.ui import Button, DynamicItem, Select, View
 
-import discord
-from discord.ui import Button, Select, View
+from cogs.music.title_index import MAX_CHOICE_LENGTH
 
 
 def get_readable_duration(duration):
@@ -18,45 +17,138 @@ def get_readable_duration(duration):
     return duration
 
 
-class SearchSelect(Select):
-    def __init__(self, player):
-        super().__init__()
-        self.player = player
+class SearchSelect(
+    DynamicItem[Select], template=r"music:pick:(?P<guild_id>[0-9]+)"
+):
+    """Track picker of search results. Its custom_id only encodes the
+    guild, so it stays working without keeping a view per message."""
+
+    def __init__(self, guild_id, options=()):
+        super().__init__(
+            Select(custom_id=f"music:pick:{guild_id}", options=list(options))
+        )
+        self.guild_id = guild_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["guild_id"]), item.options)
 
     async def callback(self, interaction):
-        await self.player.music.play(interaction, self.values[0])
+        music = interaction.client.get_cog("Music")
+        await music.play(interaction, self.item.values[0])
 
 
 class SearchView(View):
-    def __init__(self, player, tracks):
+    def __init__(self, guild_id, tracks):
         super().__init__(timeout=None)
         self.msg = "Choose a track!"
-        self.add_item(self.add_selection(tracks, player))
+        self.add_item(self.add_selection(tracks, guild_id))
+
+    def add_selection(self, tracks, guild_id):
+        selection = SearchSelect(guild_id)
 
-    def add_selection(self, tracks, player):
-        selection = SearchSelect(player)
+        # values are limited like choices, long paths of local tracks are
+        # left out
+        tracks = [
+            track
+            for track in tracks
+            if len(track["webpage_url"]) <= MAX_CHOICE_LENGTH
+        ]
 
         # above 25: raises maximum number of options already provided
         for track in tracks[-25:]:
-            selection.add_option(
-                label=track["title"],
-                description=get_readable_duration(track["duration"]),
+            selection.item.add_option(
+                label=track["title"][:100],
+                description=get_readable_duration(track["duration"] or 0),
                 value=track["webpage_url"],
             )
         return selection
 
 
+class PlayerButton(
+    DynamicItem[Button],
+    template=r"music:(?P<action>[a-z_]+):(?P<guild_id>[0-9]+)",
+):
+    """Control button of the player panel. All of them are routed by their
+    custom_id (action and guild) to the guild's player, so no view has to
+    be kept per panel and the buttons keep working after a restart."""
+
+    def __init__(self, action, guild_id, *, emoji=None, label=None, row=0):
+        super().__init__(
+            Button(
+                emoji=emoji,
+                label=label,
+                row=row,
+                custom_id=f"music:{action}:{guild_id}",
+            )
+        )
+        self.action = action
+        self.guild_id = guild_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(
+            match["action"],
+            int(match["guild_id"]),
+            emoji=item.emoji,
+            label=item.label,
+        )
+
+    async def callback(self, interaction):
+        music = interaction.client.get_cog("Music")
+        player = music.players.get(self.guild_id)
+        if not player or not player.gapless:
+            msg = "Nothing is being played right now."
+            return await interaction.response.send_message(
+                msg, ephemeral=True
+            )
+
+        if self.action == "pause":
+            await music.pause(interaction)
+        elif self.action == "resume":
+            await music.resume(interaction)
+        elif self.action == "skip":
+            await music.skip(interaction)
+        elif self.action == "loop_queue":
+            await music.loop_queue(interaction)
+        elif self.action == "loop_track":
+            await music.loop_track(interaction)
+        elif self.action == "shuffle":
+            await music.shuffle(interaction)
+
+        player.view = PlayerView(player, player.gapless.current)
+        await interaction.response.edit_message(
+            content=player.view.msg, view=player.view
+        )
+
+
 class PlayerView(View):
     def __init__(self, player, source):
         super().__init__(timeout=None)
-        self.add_item(
-            Button(
-                label="Current playing track link", url=source["webpage_url"], row=1
+        guild_id = player.interaction.guild_id
+        vc = player.interaction.guild.voice_client
+        if vc and vc.is_paused():
+            self.add_item(PlayerButton("resume", guild_id, emoji="▶️"))
+        else:
+            self.add_item(PlayerButton("pause", guild_id, emoji="⏸️"))
+        self.add_item(PlayerButton("skip", guild_id, emoji="⏭️"))
+        self.add_item(PlayerButton("loop_queue", guild_id, emoji="🔁"))
+        self.add_item(PlayerButton("loop_track", guild_id, emoji="🔂"))
+        self.add_item(PlayerButton("shuffle", guild_id, emoji="🔀"))
+        # local tracks of the library have no page to link to
+        if source["webpage_url"].startswith("http"):
+            self.add_item(
+                Button(
+                    label="Current playing track link",
+                    url=source["webpage_url"],
+                    row=1,
+                )
             )
+        self.add_item(
+            PlayerButton("refresh", guild_id, label="Refresh", row=1)
         )
         self.player = player
         self.source = source
-        self.start = default_timer()
         self.update_msg()
 
     def update_msg(self):
@@ -66,11 +158,11 @@ class PlayerView(View):
         """Display information about player and queue of songs."""
 
         tracks, remains, volume, loop_q, loop_t = self._get_page_info()
-        end = default_timer()
-        dur_total = self.source.duration
+        filters = ", ".join(self.player.filters) or "none"
+        dur_total = self.source.duration or 0
         dur_total = get_readable_duration(dur_total)
         dur_total = "0:00:00" if dur_total.startswith("-") else dur_total
-        dur_curr = end - self.start
+        dur_curr = self.source.position
         dur_curr = get_readable_duration(dur_curr)
         dur_curr = "0:00:00" if dur_curr.startswith("-") else dur_curr
 
@@ -80,14 +172,17 @@ class PlayerView(View):
         loop_t = f"(🔂) Loop Track: {loop_t}"
         req = f"Requester: '{self.source.requester}'"
         dur = f"Duration: {dur_curr} (refreshable) / {dur_total}"
-        views = f"Views: {self.source.view_count:,}"
+        views = self.source.view_count
+        views = f"Views: {views:,}" if views is not None else "Local track"
+        filters = f"Filters: {filters}"
 
         msg = (
             f"```ml\n{tracks}\n"
             f"{remains}     currently playing track:\n"
             f"{loop_q}      {req}\n"
             f"{loop_t}      {dur}\n"
-            f"{vol}               {views}```"
+            f"{vol}               {views}\n"
+            f"{filters}```"
         )
 
         return msg
@@ -133,48 +228,3 @@ class PlayerView(View):
             track_list.append(row)
 
         return track_list
-
-    async def on_error(self, interaction, error, item):
-        msg = f"Item '{item}' has failed the dispatch. Error: {error}."
-        await interaction.response.send_message(msg)
-
-    @discord.ui.button(emoji="⏸️", row=0)
-    async def play_callback(self, interaction, button):
-        if button.emoji.name == "⏸️":
-            error = await self.player.music.pause(interaction)
-            if not error:
-                button.emoji.name = "▶️"
-        elif button.emoji.name == "▶️":
-            error = await self.player.music.resume(interaction)
-            if not error:
-                button.emoji.name = "⏸️"
-
-        await interaction.response.edit_message(view=self)
-
-    @discord.ui.button(emoji="⏭️", row=0)
-    async def skip_callback(self, interaction, button):
-        await self.player.music.skip(interaction)
-        await interaction.response.edit_message(view=self)
-
-    @discord.ui.button(emoji="🔁", row=0)
-    async def loop_q_callback(self, interaction, button):
-        await self.player.music.loop_queue(interaction)
-        msg = self.generate_message()
-        await interaction.response.edit_message(content=msg, view=self)
-
-    @discord.ui.button(emoji="🔂", row=0)
-    async def loop_t_callback(self, interaction, button):
-        await self.player.music.loop_track(interaction)
-        msg = self.generate_message()
-        await interaction.response.edit_message(content=msg, view=self)
-
-    @discord.ui.button(emoji="🔀", row=0)
-    async def shuffle_callback(self, interaction, button):
-        await self.player.music.shuffle(interaction)
-        msg = self.generate_message()
-        await interaction.response.edit_message(content=msg, view=self)
-
-    @discord.ui.button(label="Refresh", row=1)
-    async def refresh_callback(self, interaction, button):
-        msg = self.generate_message()
-        await interaction.response.edit_message(content=msg, view=self)
@@ -0,0 +1,161 @@
+import asyncio
+import collections
+from datetime import timedelta
+
+import numpy as np
+
+from cogs.music.request_log import request_log
+
+SESSION_GAP = timedelta(hours=2)  # pause in requests that ends a session
+SESSION_WINDOW = 10  # requests of a session each request is paired with
+UPDATE_INTERVAL = 60  # seconds between merges of new pairs into the matrix
+FALLBACK_CANDIDATES = 50  # most requested tracks tried when nothing relates
+
+
+class Recommender:
+    """Picks a track related to another one from our own request history.
+
+    Tracks requested by the same user within one session (requests less
+    than SESSION_GAP apart) co-occur, the closer the requests the higher
+    the weight. Co-occurrences are summed in a sparse symmetric matrix in
+    CSR form (indptr, indices, data arrays), so a pick is a lookup of one
+    row. New pairs are collected as they come and merged into the matrix
+    periodically in the background.
+    """
+
+    def __init__(self):
+        self.task = None
+        self._reset()
+
+    def _reset(self):
+        self.ids = {}  # webpage_url: row of the matrix
+        self.urls = []  # row: webpage_url
+        self.titles = {}  # webpage_url: title
+        self.requests = collections.Counter()
+        self.matrix = (
+            np.zeros(1, dtype=np.int64),
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0),
+        )
+
+        self._sessions = {}  # requester: (last date, deque of recent rows)
+        self._rows = []
+        self._cols = []
+        self._weights = []
+
+    def rebuild(self, events):
+        """Builds the matrix from scratch out of request events."""
+
+        self._reset()
+        for event in events:
+            self.add(event)
+        self.matrix = self._merge(
+            self.matrix, len(self.urls), *self._take_pairs()
+        )
+
+    def add(self, event):
+        """Collects co-occurrence pairs of a new request event."""
+
+        url = event.webpage_url
+        if url not in self.ids:
+            self.ids[url] = len(self.urls)
+            self.urls.append(url)
+        self.titles[url] = event.title
+        self.requests[url] += 1
+        row = self.ids[url]
+
+        last_date, recent = self._sessions.get(event.requester, (None, None))
+        if last_date is None or event.date - last_date > SESSION_GAP:
+            recent = collections.deque(maxlen=SESSION_WINDOW)
+        self._sessions[event.requester] = event.date, recent
+
+        for distance, other in enumerate(reversed(recent), 1):
+            if other != row:
+                self._rows += (row, other)
+                self._cols += (other, row)
+                self._weights += (1 / distance,) * 2
+        recent.append(row)
+
+    def _take_pairs(self):
+        pairs = self._rows, self._cols, self._weights
+        self._rows, self._cols, self._weights = [], [], []
+        return pairs
+
+    @staticmethod
+    def _merge(matrix, size, rows, cols, weights):
+        """Adds weighted pairs into the CSR matrix, summing duplicates.
+
+        Args:
+            matrix (Tuple[np.ndarray, np.ndarray, np.ndarray]): indptr,
+                indices and data of the current matrix
+            size (int): amount of rows (and columns) of the new matrix
+            rows, cols, weights (List): coordinates and values of pairs
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: the new matrix
+        """
+
+        indptr, indices, data = matrix
+        old_rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+        rows = np.concatenate((old_rows, np.asarray(rows, dtype=np.int64)))
+        cols = np.concatenate((indices, np.asarray(cols, dtype=np.int64)))
+        data = np.concatenate((data, np.asarray(weights, dtype=np.float64)))
+
+        keys, inverse = np.unique(
+            rows * max(size, 1) + cols, return_inverse=True
+        )
+        data = np.bincount(inverse, weights=data)
+        rows, cols = np.divmod(keys, max(size, 1))
+
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+
+        return indptr, cols.astype(np.int32), data
+
+    async def run(self, loop):
+        """Merges collected pairs into the matrix in the background."""
+
+        while True:
+            await asyncio.sleep(UPDATE_INTERVAL)
+            if not self._rows:
+                continue
+
+            pairs = self._take_pairs()
+            self.matrix = await loop.run_in_executor(
+                None, self._merge, self.matrix, len(self.urls), *pairs
+            )
+
+    def recommend(self, webpage_url, exclude=()):
+        """Picks the track that co-occurs with the given one the most.
+        Falls back to the most requested tracks if none does.
+
+        Args:
+            webpage_url (str): URL of the track to relate to
+            exclude (Container[str], optional): URLs not to pick, e.g.
+                recently played ones. Defaults to ().
+
+        Returns:
+            Tuple[str, str] | None: title and URL of the picked track
+        """
+
+        indptr, indices, data = self.matrix
+        row = self.ids.get(webpage_url)
+        candidates = []
+        if row is not None and row + 1 < len(indptr):
+            start, end = indptr[row], indptr[row + 1]
+            order = np.argsort(data[start:end])[::-1]
+            candidates = [self.urls[col] for col in indices[start:end][order]]
+
+        candidates += [
+            url for url, _ in self.requests.most_common(FALLBACK_CANDIDATES)
+        ]
+        for url in candidates:
+            if url not in exclude and url != webpage_url:
+                return self.titles[url], url
+
+        return None
+
+
+recommender = Recommender()
+request_log.subscribe(recommender.add)
@@ -0,0 +1,72 @@
+import asyncio
+import collections
+
+import pandas as pd
+
+import utils
+
+RequestEvent = collections.namedtuple(
+    "RequestEvent", ("date", "requester", "title", "webpage_url", "guild_id")
+)
+
+
+class RequestLog:
+    """Track requests known to the bot: the records of 'Commands Log'
+    worksheet (saved by the history command) loaded at startup, followed
+    by every request made since then.
+
+    Indexes built on top of the requests subscribe to it, so that they are
+    updated incrementally instead of being rebuilt.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.version = 0  # increases with each request
+        self.loaded = False
+        self.lock = asyncio.Lock()  # bots of one process load it only once
+        self._listeners = []
+
+    def subscribe(self, listener):
+        """Registers a callable that gets called with every new event."""
+
+        self._listeners.append(listener)
+
+    def load(self):
+        """Loads past requests from Google Sheets. Blocking, run it in an
+        executor.
+
+        Returns:
+            List[RequestEvent]: loaded requests, sorted by date
+        """
+
+        _, ws_dfs = utils.get_worksheets(
+            "Discord Music Log", ("Commands Log",)
+        )
+        cmd_df = ws_dfs[0].iloc[:, :4]
+        cmd_df.columns = ["Date", "Requester", "Title", "URL"]
+        cmd_df["Date"] = pd.to_datetime(cmd_df["Date"], errors="coerce")
+        cmd_df = cmd_df.dropna().sort_values(by="Date")
+
+        events = [
+            RequestEvent(date.to_pydatetime(), requester, title, url, None)
+            for date, requester, title, url in cmd_df.itertuples(
+                index=False, name=None
+            )
+        ]
+
+        self.events = events + self.events
+        self.version += 1
+        self.loaded = True
+
+        return events
+
+    def add(self, event):
+        """Records a new request and passes it to the subscribers."""
+
+        self.events.append(event)
+        self.version += 1
+        for listener in self._listeners:
+            listener(event)
+
+
+request_log = RequestLog()
@@ -0,0 +1,207 @@
+import asyncio
+import os
+import threading
+import time
+
+import discord
+from discord.enums import SpeakingState
+from discord.errors import ClientException
+
+FRAME_DELAY = discord.opus.Encoder.FRAME_LENGTH / 1000  # 20ms
+MAX_LAG_FRAMES = 5  # a sender further behind skips ahead instead of bursting
+
+# amount of shared sender threads, unset or 0 keeps a thread per voice client
+SENDER_THREADS = int(os.environ.get("SHARED_AUDIO_SENDERS") or 0)
+
+
+class ScheduledPlayer:
+    """Stand-in for discord.player.AudioPlayer that does not run a thread
+    of its own. A SenderThread calls tick() every 20ms instead, for all of
+    its players. Installed as the voice client's _player, so that the
+    client's pause/resume/stop, is_playing and source work as usual.
+    """
+
+    def __init__(self, source, client, *, after=None):
+        self.source = source
+        self.client = client
+        self.after = after
+        self.sender = None
+
+        self._end = threading.Event()
+        self._paused = False
+        self._current_error = None
+
+    def tick(self):
+        """Sends one frame, called by the sender thread every 20ms. The
+        source must not block, it sends silence when it has nothing yet."""
+
+        if self._paused or not self.client.is_connected():
+            return
+
+        try:
+            data = self.source.read()
+            if data:
+                self.client.send_audio_packet(
+                    data, encode=not self.source.is_opus()
+                )
+                return
+        except Exception as err:
+            self._current_error = err
+
+        self.stop()
+
+    def _finish(self):
+        try:
+            if self.after is not None:
+                self.after(self._current_error)
+            elif self._current_error:
+                print(f"Exception in voice sender: {self._current_error}")
+        finally:
+            self.source.cleanup()
+
+    def stop(self):
+        if self._end.is_set():
+            return
+
+        self._end.set()
+        self._speak(SpeakingState.none)
+        if self.sender:
+            self.sender.remove(self)
+        # cleanup kills ffmpeg, the sender must not wait for that
+        threading.Thread(target=self._finish, daemon=True).start()
+
+    def pause(self, *, update_speaking=True):
+        self._paused = True
+        if update_speaking:
+            self._speak(SpeakingState.none)
+
+    def resume(self, *, update_speaking=True):
+        self._paused = False
+        if update_speaking:
+            self._speak(SpeakingState.voice)
+
+    def is_playing(self):
+        return not self._paused and not self._end.is_set()
+
+    def is_paused(self):
+        return self._paused and not self._end.is_set()
+
+    def set_source(self, source):
+        self.source = source
+
+    def _speak(self, speaking):
+        try:
+            asyncio.run_coroutine_threadsafe(
+                self.client.ws.speak(speaking), self.client.client.loop
+            )
+        except Exception as err:
+            print(f"Speaking call in voice sender failed: {err}")
+
+
+class SenderThread(threading.Thread):
+    """Sends frames of many players from one timing loop, so that hundreds
+    of voice clients do not need hundreds of threads waking up on their
+    own every 20ms and contending for the GIL."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.players = []
+        self.ticks = 0
+        self.late_ticks = 0  # ticks that started over a frame late
+        self.max_drift = 0.0  # seconds the worst tick started late
+        self.busy = 0.0  # seconds spent sending, for its share of time
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def add(self, player):
+        with self._lock:
+            self.players.append(player)
+            player.sender = self
+        self._wakeup.set()
+
+    def remove(self, player):
+        with self._lock:
+            if player in self.players:
+                self.players.remove(player)
+
+    def run(self):
+        next_time = time.perf_counter()
+        while True:
+            with self._lock:
+                players = list(self.players)
+            if not players:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                next_time = time.perf_counter()
+                continue
+
+            started = time.perf_counter()
+            drift = started - next_time
+            if drift > FRAME_DELAY:
+                self.late_ticks += 1
+            self.max_drift = max(self.max_drift, drift)
+            if drift > FRAME_DELAY * MAX_LAG_FRAMES:
+                next_time = started
+
+            for player in players:
+                player.tick()
+
+            self.ticks += 1
+            self.busy += time.perf_counter() - started
+            next_time += FRAME_DELAY
+            time.sleep(max(0, next_time - time.perf_counter()))
+
+
+class AudioScheduler:
+    """Fixed set of sender threads that drive all scheduled players, each
+    new player goes to the least loaded thread."""
+
+    def __init__(self, threads):
+        self.senders = [SenderThread() for _ in range(threads)]
+        for sender in self.senders:
+            sender.start()
+
+    def play(self, client, source, *, after=None):
+        """Does what discord.VoiceClient.play does, but with the voice
+        client's frames sent by a shared sender thread."""
+
+        if not client.is_connected():
+            raise ClientException("Not connected to voice.")
+        if client.is_playing():
+            raise ClientException("Already playing audio.")
+        if not client.encoder and not source.is_opus():
+            client.encoder = discord.opus.Encoder()
+
+        player = ScheduledPlayer(source, client, after=after)
+        client._player = player
+        player.resume()
+        min(self.senders, key=lambda sender: len(sender.players)).add(player)
+
+    def summary(self):
+        """Describes timing of the sender threads for diagnostics."""
+
+        summary = ""
+        for i, sender in enumerate(self.senders, 1):
+            ticks = sender.ticks or 1
+            summary += (
+                f"Sender {i}: {len(sender.players)} players, "
+                f"{sender.late_ticks / ticks:.2%} late ticks, "
+                f"max drift {sender.max_drift * 1000:.1f} ms, "
+                f"{sender.busy / (ticks * FRAME_DELAY):.1%} busy\n"
+            )
+
+        return summary
+
+
+audio_scheduler = AudioScheduler(SENDER_THREADS) if SENDER_THREADS else None
+
+
+def play(client, source, *, after=None):
+    """Plays the source on the voice client, with a shared sender thread
+    if SHARED_AUDIO_SENDERS is set, or with discord's own player thread."""
+
+    if audio_scheduler:
+        audio_scheduler.play(client, source, after=after)
+    else:
+        client.play(source, after=after)
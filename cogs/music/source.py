@@ -1,10 +1,16 @@
 import asyncio
 import functools
-import os
+import time
 
-import discord
 import youtube_dl
-import yt_dlp
+
+from cogs.music.dsp import DSPTransformer
+from cogs.music.governor import governor
+from cogs.music.library import is_local, library
+from cogs.music.stream_cache import stream_cache
+from cogs.music.streaming import StreamingSource
+from cogs.music.throttle import ThrottledError, ThrottledExtractor
+from cogs.music.ydl_pool import YoutubeDLPool
 
 # Suppress noise about console usage from errors
 youtube_dl.utils.bug_reports_message = lambda: ""
@@ -15,7 +21,8 @@ ytdlopts = {
     "restrictfilenames": True,
     "noplaylist": True,
     "nocheckcertificate": True,
-    "ignoreerrors": True,  # False
+    # extraction errors are raised and handled by ThrottledExtractor
+    "ignoreerrors": "only_download",
     "logtostderr": False,
     "quiet": True,
     "no_warnings": True,
@@ -23,34 +30,340 @@ ytdlopts = {
     "source_address": "0.0.0.0",  # ipv6 addresses cause issues sometimes
 }
 
-ytdl = yt_dlp.YoutubeDL(ytdlopts)
+ytdl_pool = YoutubeDLPool(ytdlopts)
+# playlists and searches only list their entries, without resolving each
+ytdl_flat_pool = YoutubeDLPool({**ytdlopts, "extract_flat": "in_playlist"})
+
+# the only fields of extracted info that are used by the bot
+INFO_FIELDS = (
+    "title",
+    "webpage_url",
+    "duration",
+    "view_count",
+    "url",
+    "abr",
+    "acodec",
+)
+FORMAT_FIELDS = ("url", "abr", "acodec")
+
+
+def _extract_info(url, flat=False):
+    pool = ytdl_flat_pool if flat else ytdl_pool
+
+    # the instance is borrowed only once there is capacity, so waiting for
+    # a slot neither holds nor recycles it
+    def extract():
+        with pool.instance() as instance:
+            return instance.extract_info(url=url, download=False)
+
+    return governor.extract(extract)
+
+
+extractor = ThrottledExtractor(_extract_info)
+
+
+def extract_info(url, flat=False):
+    """Extracts info about the URL or search with yt-dlp, within the
+    capacity of the resource governor, backing off while throttled.
+
+    Args:
+        url (str): URL or search term (with optional 'ytsearchN:' prefix)
+        flat (bool, optional): do not resolve playlist or search entries.
+            Defaults to False.
+
+    Raises:
+        ThrottledError: the host throttles us, extraction was not tried
+        ExtractionError: extraction failed or found nothing
+        CapacityError: no capacity for the extraction
+
+    Returns:
+        Dict: info extracted by yt-dlp
+    """
+
+    return extractor(url, flat)
+
+
+def slim_info(info):
+    """Trims extracted info down to INFO_FIELDS, so that lists of formats,
+    thumbnails and subtitles are not held in queues and views.
+
+    Args:
+        info (Dict): info extracted by yt-dlp
+
+    Returns:
+        Dict: title, webpage_url, duration, view_count, url (and entries)
+    """
+
+    slim = {field: info.get(field) for field in INFO_FIELDS}
+
+    # flat entries have no stream, their url is the page of the track
+    if info.get("_type") in ("url", "url_transparent"):
+        slim["webpage_url"] = slim["webpage_url"] or slim["url"]
+        slim["url"] = None
+
+    if "entries" in info:
+        slim["entries"] = [
+            slim_info(entry) for entry in info["entries"] if entry
+        ]
+    if info.get("formats"):
+        slim["formats"] = get_audio_formats(info["formats"])
+
+    return slim
+
+
+def get_audio_formats(formats):
+    """Gets audio-only formats, trimmed down to FORMAT_FIELDS.
+
+    Args:
+        formats (List[Dict]): 'formats' of info extracted by yt-dlp
+
+    Returns:
+        List[Dict]: url, abr (kbps) and acodec of audio-only formats
+    """
+
+    return [
+        {
+            "url": fmt["url"],
+            "abr": fmt.get("abr") or fmt.get("tbr"),
+            "acodec": fmt.get("acodec"),
+        }
+        for fmt in formats
+        if fmt.get("url")
+        and fmt.get("vcodec") == "none"
+        and fmt.get("acodec") not in (None, "none")
+    ]
+
+
+def select_format(formats, bitrate):
+    """Picks the audio format that fits the voice channel's bitrate best.
+    Opus is preferred as it is what discord plays, then the lowest bitrate
+    that still reaches the channel's, so that neither bandwidth nor
+    transcoding is spent on quality the channel throws away.
+
+    Args:
+        formats (List[Dict]): formats from get_audio_formats
+        bitrate (int): bitrate of the voice channel in kbps
+
+    Returns:
+        Dict | None: url, abr and acodec of the format, None if no formats
+    """
+
+    def rank(fmt):
+        abr = fmt["abr"] or 0
+        return fmt["acodec"] != "opus", abr < bitrate, abs(abr - bitrate)
+
+    return min(formats, key=rank, default=None)
+
+
+def with_format(data, bitrate):
+    """Gets stream data with the stream of the format fitting the bitrate,
+    keeps yt-dlp's pick (bestaudio) if there are no formats or bitrate."""
+
+    fmt = select_format(data.get("formats") or (), bitrate or 0)
+    if not bitrate or fmt is None:
+        return data
+
+    return {**data, **fmt}
+
+
+def resolve_stream(webpage_url, refresh=False, bitrate=None):
+    """Gets the stream data of a track, extracting it only when there is
+    no cached stream URL that stays valid for a while.
+
+    Args:
+        webpage_url (str): URL of the track's page
+        refresh (bool, optional): ignore the cache. Defaults to False.
+        bitrate (int, optional): bitrate of the voice channel in kbps to
+            pick the format for. Defaults to None.
+
+    Returns:
+        Dict: extracted data with 'url' being the direct stream URL
+    """
+
+    if is_local(webpage_url):
+        return library.resolve(webpage_url)
+
+    data = None if refresh else stream_cache.get(webpage_url)
+    if data is None:
+        try:
+            data = slim_info(extract_info(webpage_url))
+        except ThrottledError:
+            # a cached URL close to its expiry beats no URL at all
+            data = stream_cache.get(webpage_url, margin=0)
+            if data is None:
+                raise
+            return with_format(data, bitrate)
+        stream_cache.put(webpage_url, data)
+
+    return with_format(data, bitrate)
 
 
-class YTDLSource(discord.PCMVolumeTransformer):
-    def __init__(self, source, *, data, requester):
-        super().__init__(source)
+def recover_stream(webpage_url, failed_url, bitrate=None):
+    """Gets stream data to resume a stalled stream with. The cached URL is
+    tried first, it may have been refreshed meanwhile (see refresh_streams
+    of the player); the track is extracted again only if the cached one
+    is the URL that failed.
+
+    Args:
+        webpage_url (str): URL of the track's page
+        failed_url (str): stream URL that stalled
+        bitrate (int, optional): bitrate of the voice channel in kbps.
+            Defaults to None.
+
+    Returns:
+        Dict: extracted data with 'url' being the direct stream URL
+    """
+
+    data = resolve_stream(webpage_url, bitrate=bitrate)
+    if data["url"] == failed_url:
+        data = resolve_stream(webpage_url, refresh=True, bitrate=bitrate)
+
+    return data
+
+
+class YTDLSource(DSPTransformer):
+    def __init__(
+        self,
+        *,
+        data,
+        requester,
+        timestamp=0,
+        filters=(),
+        stats=None,
+        bitrate=None,
+        volume=1.0,
+    ):
         self.requester = requester
+        self.stream_url = data.get("url")
+        self.filters = tuple(filters)
+        self.stats = stats  # FrameStats of the guild
+        self.bitrate = bitrate  # of the voice channel, picks the format
+        self.abr = data.get("abr")  # of the stream
+        self.acodec = data.get("acodec")
+        gain = data.get("gain")  # ReplayGain of local tracks in dB
 
         self.title = data.get("title")
         self.webpage_url = data.get("webpage_url")
         self.duration = data.get("duration")
         self.view_count = data.get("view_count")
 
+        loudness = 10 ** (gain / 20) if gain is not None else 1.0
+        super().__init__(
+            self.open_stream(timestamp), volume=volume, loudness=loudness
+        )
+
     def __getitem__(self, item: str):
         """Allows us to access attributes similar to a dict.
         This is only useful when you are NOT downloading.
         """
         return self.__getattribute__(item)
 
+    def open_stream(self, timestamp):
+        """Starts a supervised ffmpeg stream of the track at the timestamp.
+
+        Args:
+            timestamp (float): position in seconds
+
+        Returns:
+            cogs.music.streaming.StreamingSource: stream of the track
+        """
+
+        return StreamingSource(
+            self.stream_url,
+            timestamp=timestamp,
+            duration=self.duration,
+            resolve=self.refresh_stream_url,
+            filters=self.filters,
+            stats=self.stats,
+            abr=self.abr,
+        )
+
+    def refresh_stream_url(self, failed_url):
+        """Resolves a stream URL to resume with, called when the stream
+        stalls."""
+
+        data = recover_stream(self.webpage_url, failed_url, self.bitrate)
+        self.stream_url = data["url"]
+        return self.stream_url
+
+    def read(self):
+        started = time.perf_counter()
+        while True:
+            original = self.original
+            data = super().read()
+            # stream replaced by seek() ends early, continue with the new one
+            if data or original is self.original:
+                break
+
+        if self.stats and data:
+            self.stats.record(started, time.perf_counter())
+        return data
+
+    @property
+    def position(self):
+        """Seconds into the track, counted from the frames read so far."""
+
+        return self.original.position
+
+    def seek(self, timestamp):
+        """Restarts ffmpeg at the timestamp on the already resolved stream
+        URL, so the track does not need to be extracted again.
+
+        Args:
+            timestamp (int): position in seconds
+        """
+
+        if self.duration and self.duration < timestamp + 5:
+            timestamp = max(self.duration - 5, 0)
+
+        self.restart(timestamp)
+
+    def set_filters(self, filters):
+        """Applies audio filters by restarting ffmpeg at the current
+        position with a new filtergraph, on the same stream URL.
+
+        Args:
+            filters (Iterable[str]): names of filters (cogs.music.filters)
+        """
+
+        self.filters = tuple(filters)
+        self.restart(self.position)
+
+    def restart(self, timestamp):
+        old_original = self.original
+        self.original = self.open_stream(timestamp)
+        old_original.cleanup()
+        self.flush()
+
     @classmethod
-    async def create_source(
-        cls, interaction, search: str, *, loop, playlist=False
-    ):
+    async def create_source(cls, search: str, *, loop):
+        """Finds track(s) of the search, URL or playlist URL.
+
+        Returns:
+            Dict: title and webpage_url of what was found (e.g. playlist),
+                entries with the individual tracks
+        """
+
         loop = loop or asyncio.get_event_loop()
-        to_run = functools.partial(
-            ytdl.extract_info, url=search, download=False
-        )
-        data = await loop.run_in_executor(None, to_run)
+
+        # local tracks are found right away, without any extraction
+        if is_local(search):
+            data = library.resolve(search)
+            return {**data, "entries": [data]}
+        if library.enabled and not search.startswith("http"):
+            found = library.search(search, limit=1)
+            if found:
+                return {**found[0], "entries": found}
+
+        to_run = functools.partial(extract_info, search, flat=True)
+        try:
+            data = slim_info(await loop.run_in_executor(None, to_run))
+        except ThrottledError:
+            # URL of a track that has been resolved recently
+            cached = stream_cache.get(search, margin=0)
+            if cached is None:
+                raise
+            data = dict(cached)
 
         if "entries" in data:
             if len(data["entries"]) == 1:  # for search single song
@@ -59,51 +372,48 @@ class YTDLSource(discord.PCMVolumeTransformer):
         else:  # for URL single song
             data["entries"] = [data]
 
-        # hackis, need to resolve DL
-        if not playlist:
-            titled_url = f"[{data['title']}]({data['webpage_url']})"
-            description = f"Queued {titled_url} [{interaction.user.mention}]"
-            embed = discord.Embed(
-                title="", description=description, color=discord.Color.green()
-            )
-            await interaction.followup.send(embed=embed)
-
-        return data["entries"]
+        return data
 
     @classmethod
-    async def regather_stream(cls, data, *, loop, timestamp=0):
+    async def regather_stream(
+        cls,
+        data,
+        *,
+        loop,
+        timestamp=0,
+        filters=(),
+        stats=None,
+        bitrate=None,
+        volume=1.0,
+    ):
         """Used for preparing a stream, instead of downloading.
-        Since Youtube Streaming links expire."""
+        Since Youtube Streaming links expire, they are reused only until
+        shortly before their expiry (see stream_cache). Frames of the
+        stream are timed into stats (FrameStats of the guild) if given,
+        the format is picked for the channel's bitrate (kbps) if given.
+        The stream starts at the volume, so it is not ramped down from
+        full volume at the start."""
 
         loop = loop or asyncio.get_event_loop()
         requester = data["requester"]
 
         to_run = functools.partial(
-            ytdl.extract_info, url=data["webpage_url"], download=False
+            resolve_stream, data["webpage_url"], bitrate=bitrate
         )
         data = await loop.run_in_executor(None, to_run)
 
         # set timestamp for last 5 seconds if set too high
-        if data["duration"] < timestamp + 5:
+        if data["duration"] and data["duration"] < timestamp + 5:
             timestamp = data["duration"] - 5
-        reconnect_streamed = "-reconnect 1 -reconnect_streamed 1"
-        reconnect_delay = "-reconnect_delay_max 5"
-        ffmpeg_opts = {
-            "options": f"-vn -ss {timestamp}",
-            "before_options": f"{reconnect_streamed} {reconnect_delay}",
-        }
-        ffmpeg_path = (
-            "C:/ffmpeg/ffmpeg.exe" if os.name == "nt" else "/usr/bin/ffmpeg"
-        )
 
         return cls(
-            discord.FFmpegPCMAudio(
-                data["url"],
-                **ffmpeg_opts,
-                executable=ffmpeg_path,
-            ),
             data=data,
             requester=requester,
+            timestamp=timestamp,
+            filters=filters,
+            stats=stats,
+            bitrate=bitrate,
+            volume=volume,
         )
 
     @classmethod
@@ -111,8 +421,8 @@ class YTDLSource(discord.PCMVolumeTransformer):
         loop = loop or asyncio.get_event_loop()
 
         to_run = functools.partial(
-            ytdl.extract_info, url="ytsearch10: " + search, download=False
+            extract_info, "ytsearch10: " + search, flat=True
         )
-        data = await loop.run_in_executor(None, to_run)
+        data = slim_info(await loop.run_in_executor(None, to_run))
 
-        return data["entries"]
+        return library.search(search, limit=10) + data["entries"]
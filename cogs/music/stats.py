@@ -0,0 +1,141 @@
+import asyncio
+import collections
+import concurrent.futures
+import multiprocessing
+from datetime import datetime, timedelta
+
+from cogs.music import charts
+from cogs.music.request_log import request_log
+
+RENDER_WORKERS = 2
+LEADERBOARD_SIZE = 10
+
+# period: (how far back it goes, timeline bucket)
+PERIODS = {
+    "week": (timedelta(weeks=1), "day"),
+    "month": (timedelta(days=30), "day"),
+    "year": (timedelta(days=365), "month"),
+    "lifetime": (None, "month"),
+}
+
+
+def bucket_key(date, bucket):
+    if bucket == "day":
+        return date.strftime("%m-%d")
+    return date.strftime("%Y-%m")
+
+
+def bucket_range(start, end, bucket):
+    """Labels of all buckets from start to end, empty ones included."""
+
+    keys = []
+    date = start
+    while date <= end:
+        key = bucket_key(date, bucket)
+        if not keys or keys[-1] != key:
+            keys.append(key)
+        date += timedelta(days=1)
+
+    return keys
+
+
+class StatsRenderer:
+    """Renders charts of the request log in a process pool, so that
+    neither drawing nor PNG encoding holds up the event loop.
+
+    Rendered images are cached along with request_log.version they were
+    rendered from, so they are rendered again only after new requests.
+    """
+
+    def __init__(self):
+        self._pool = None
+        self._cache = {}  # period: (version, (leaderboard, timeline))
+
+    @property
+    def pool(self):
+        # spawned, not forked, as the bot's process runs a bunch of threads
+        if self._pool is None:
+            context = multiprocessing.get_context("spawn")
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                RENDER_WORKERS, mp_context=context
+            )
+        return self._pool
+
+    @staticmethod
+    def rollup(period, now):
+        """Summarizes requests of the period.
+
+        Args:
+            period (str): key of PERIODS
+            now (datetime.datetime): end of the period, naive local time
+
+        Returns:
+            Tuple[List, List, List]: (name, count) of top requesters, of top
+                tracks and (bucket label, count) of the timeline
+        """
+
+        span, bucket = PERIODS[period]
+        since = now - span if span else datetime.min
+        events = [
+            event for event in request_log.events if event.date >= since
+        ]
+
+        requesters = collections.Counter(event.requester for event in events)
+        tracks = collections.Counter(event.webpage_url for event in events)
+        titles = {event.webpage_url: event.title for event in events}
+        timeline = collections.Counter(
+            bucket_key(event.date, bucket) for event in events
+        )
+
+        start = events[0].date if events and not span else since
+        keys = bucket_range(start, now, bucket) if events else []
+
+        return (
+            requesters.most_common(LEADERBOARD_SIZE),
+            [
+                (titles[url], count)
+                for url, count in tracks.most_common(LEADERBOARD_SIZE)
+            ],
+            [(key, timeline[key]) for key in keys],
+        )
+
+    async def render(self, period, now, loop):
+        """Gets PNG images of leaderboard and timeline of the period.
+
+        Args:
+            period (str): key of PERIODS
+            now (datetime.datetime): end of the period, naive local time
+            loop (asyncio.AbstractEventLoop): loop of the bot
+
+        Returns:
+            Tuple[bytes, bytes]: leaderboard and timeline PNG images
+        """
+
+        # timeline shifts with days even if there were no new requests
+        version = request_log.version, now.date()
+        cached = self._cache.get(period)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        requesters, tracks, timeline = self.rollup(period, now)
+        title = f"Requests in the last {period}"
+        if period == "lifetime":
+            title = "Requests of all time"
+
+        leaderboard, chart = await asyncio.gather(
+            loop.run_in_executor(
+                self.pool,
+                charts.render_leaderboard,
+                title,
+                [("Top requesters", requesters), ("Top tracks", tracks)],
+            ),
+            loop.run_in_executor(
+                self.pool, charts.render_timeline, title, timeline
+            ),
+        )
+
+        self._cache[period] = version, (leaderboard, chart)
+        return leaderboard, chart
+
+
+stats_renderer = StatsRenderer()
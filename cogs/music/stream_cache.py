@@ -0,0 +1,97 @@
+import collections
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+EXPIRY_MARGIN = 5 * 60  # stop handing out URLs this long before expiry
+DEFAULT_TTL = 30 * 60  # for stream URLs that do not say when they expire
+MAX_ENTRIES = 500
+
+
+def get_expiry(stream_url):
+    """Gets the unix time at which the stream URL stops working.
+
+    googlevideo URLs carry it either as the 'expire' query parameter or as
+    an '/expire/<time>/' path segment (manifest URLs).
+
+    Args:
+        stream_url (str): direct media URL
+
+    Returns:
+        float | None: unix time of expiry, None if the URL does not say
+    """
+
+    parsed = urlparse(stream_url)
+    expire = parse_qs(parsed.query).get("expire")
+    if expire:
+        value = expire[0]
+    else:
+        segments = parsed.path.split("/")
+        if "expire" not in segments[:-1]:
+            return None
+        value = segments[segments.index("expire") + 1]
+
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class StreamCache:
+    """Resolved stream data of tracks together with the time their stream
+    URL expires, keyed by the webpage URL of the track.
+
+    Data is handed out freely until EXPIRY_MARGIN before the expiry, so
+    tracks are extracted only once per URL lifetime. The cache is shared by
+    all players and accessed from executor threads as well.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, webpage_url, margin=EXPIRY_MARGIN):
+        """Gets stream data that stays valid for at least the margin.
+
+        Args:
+            webpage_url (str): URL of the track's page
+            margin (int, optional): seconds the URL has to stay valid for.
+                Defaults to EXPIRY_MARGIN.
+
+        Returns:
+            Dict | None: extracted data, None if missing or about to expire
+        """
+
+        with self._lock:
+            entry = self._entries.get(webpage_url)
+            if not entry:
+                return None
+            data, expires_at = entry
+            if expires_at - margin <= time.time():
+                return None
+            self._entries.move_to_end(webpage_url)
+
+        return data
+
+    def put(self, webpage_url, data):
+        """Stores stream data along with the parsed expiry of its URL."""
+
+        expires_at = get_expiry(data["url"]) or time.time() + DEFAULT_TTL
+        with self._lock:
+            self._entries[webpage_url] = data, expires_at
+            self._entries.move_to_end(webpage_url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def expires_in(self, webpage_url):
+        """Seconds until the cached stream URL expires, 0 if not cached."""
+
+        with self._lock:
+            entry = self._entries.get(webpage_url)
+        if not entry:
+            return 0
+        return max(entry[1] - time.time(), 0)
+
+
+stream_cache = StreamCache()
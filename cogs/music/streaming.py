@@ -0,0 +1,259 @@
+import collections
+import os
+import threading
+import time
+
+import discord
+
+from cogs.music.filters import build_filtergraph, get_speed
+from cogs.music.governor import CapacityError, governor
+
+FRAME_DURATION = discord.opus.Encoder.FRAME_LENGTH / 1000  # in seconds
+SILENCE_FRAME = b"\x00" * discord.opus.Encoder.FRAME_SIZE
+FFMPEG_PATH = "C:/ffmpeg/ffmpeg.exe" if os.name == "nt" else "/usr/bin/ffmpeg"
+
+BUFFER_FRAMES = 250  # 5 seconds of audio read ahead of the voice client
+STALL_TIMEOUT = 8  # seconds without a new frame until ffmpeg is restarted
+EARLY_EOF_TOLERANCE = 5  # seconds before the end that count as finished
+MAX_RECOVERIES = 3  # restarts of ffmpeg per stream
+
+
+def create_ffmpeg(stream_url, timestamp=0, filters=()):
+    """Spawns ffmpeg that decodes the stream from the given timestamp.
+
+    Seeking is done on the input side, so ffmpeg jumps right to the position
+    instead of decoding everything before it.
+
+    Args:
+        stream_url (str): direct media URL or a path to a local file
+        timestamp (float, optional): position in seconds. Defaults to 0.
+        filters (Iterable[str], optional): names of audio filters to apply
+            (see cogs.music.filters). Defaults to ().
+
+    Returns:
+        discord.FFmpegPCMAudio: audio source reading from ffmpeg's stdout
+    """
+
+    before_options = f"-ss {timestamp}"
+    if stream_url.startswith("http"):
+        reconnect_streamed = "-reconnect 1 -reconnect_streamed 1"
+        reconnect_delay = "-reconnect_delay_max 5"
+        before_options += f" {reconnect_streamed} {reconnect_delay}"
+
+    options = "-vn"
+    filtergraph = build_filtergraph(filters)
+    if filtergraph:
+        options += f' -af "{filtergraph}"'
+
+    return discord.FFmpegPCMAudio(
+        stream_url,
+        options=options,
+        before_options=before_options,
+        executable=FFMPEG_PATH,
+    )
+
+
+class StreamingSource(discord.AudioSource):
+    """Supervised ffmpeg stream that survives stalls of the upstream
+    connection.
+
+    Frames are read ahead on a supervising thread into a bounded buffer.
+    When no frame arrives for STALL_TIMEOUT seconds, or ffmpeg ends before
+    the known duration, a fresh stream URL is resolved and ffmpeg resumes at
+    the exact frame position it stopped at. Silence is sent meanwhile, so
+    the voice client does not take the stall as the end of the track.
+
+    Args:
+        stream_url (str): direct media URL or a path to a local file
+        timestamp (float, optional): position to start at. Defaults to 0.
+        duration (int, optional): length of the track in seconds, early EOF
+            is not detected without it. Defaults to None.
+        resolve (Callable[[str], str], optional): returns a stream URL to
+            resume with, given the one that failed; the old one is reused
+            without it. Defaults to None.
+        filters (Iterable[str], optional): names of audio filters to apply.
+            Defaults to ().
+        stats (cogs.music.frame_stats.FrameStats, optional): stats that
+            count underruns. Defaults to None.
+        abr (float, optional): bitrate of the stream in kbps, for
+            diagnostics. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        stream_url,
+        *,
+        timestamp=0,
+        duration=None,
+        resolve=None,
+        filters=(),
+        stats=None,
+        abr=None,
+    ):
+        self.stream_url = stream_url
+        self.abr = abr
+        self.timestamp = timestamp
+        self.duration = duration
+        self.resolve = resolve
+        self.filters = tuple(filters)
+        self.stats = stats
+        # seconds of the track in one frame, filters can change the speed
+        self.frame_duration = FRAME_DURATION * get_speed(self.filters)
+
+        self.frames = 0  # frames handed over to the voice client
+        self.produced = 0  # frames read from ffmpeg
+        self.recoveries = 0
+        self.last_frame_at = time.monotonic()
+
+        self._buffer = collections.deque()
+        self._cond = threading.Condition()
+        self._ffmpeg = None
+        self._ffmpeg_lock = threading.Lock()
+        self._done = False
+        self._closed = False
+        self._restarting = False  # ffmpeg was killed to resume the stream
+
+        self._thread = threading.Thread(target=self._supervise, daemon=True)
+        self._thread.start()
+
+    @property
+    def position(self):
+        """Seconds into the track, counted from the frames read so far."""
+
+        return self.timestamp + self.frames * self.frame_duration
+
+    def is_ready(self):
+        """Whether there are frames to be read without waiting for ffmpeg."""
+
+        return bool(self._buffer) or self._done
+
+    def _supervise(self):
+        while True:
+            position = self.timestamp + self.produced * self.frame_duration
+            try:
+                governor.acquire_ffmpeg(self)
+            except CapacityError as err:
+                print(f"Stream could not be started: {err}")
+                break
+            with self._ffmpeg_lock:
+                if self._closed:
+                    governor.release_ffmpeg(self)
+                    return
+                try:
+                    self._ffmpeg = create_ffmpeg(
+                        self.stream_url, position, self.filters
+                    )
+                except Exception as err:  # ClientException, ffmpeg missing
+                    governor.release_ffmpeg(self)
+                    print(f"Stream could not be started: {err}")
+                    break
+                governor.register_ffmpeg(self, self._ffmpeg)
+            self.last_frame_at = time.monotonic()
+
+            self._pump(self._ffmpeg)
+            self._kill_ffmpeg()
+
+            if self._closed:
+                return
+            # a deliberate restart resumes even without a known duration,
+            # e.g. on live streams
+            restarting, self._restarting = self._restarting, False
+            if not restarting and not self._ended_early():
+                break
+            if self.recoveries >= MAX_RECOVERIES:
+                print(f"Stream stalled at {position:.0f}s too many times.")
+                break
+
+            self.recoveries += 1
+            position = self.timestamp + self.produced * self.frame_duration
+            print(f"Stream stalled at {position:.0f}s, resuming.")
+            time.sleep(self.recoveries - 1)  # back off on repeated stalls
+            if self.resolve:
+                try:
+                    self.stream_url = self.resolve(self.stream_url)
+                except Exception as err:
+                    print(f"Stream URL could not be resolved again: {err}")
+                    break
+
+        with self._cond:
+            self._done = True
+            self._cond.notify_all()
+
+    def _pump(self, ffmpeg):
+        while True:
+            with self._cond:
+                while len(self._buffer) >= BUFFER_FRAMES and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+
+            try:
+                data = ffmpeg.read()
+            except (AttributeError, OSError, ValueError):
+                data = b""  # ffmpeg has been killed meanwhile
+            if not data:
+                return
+
+            with self._cond:
+                self._buffer.append(data)
+                self.produced += 1
+                self.last_frame_at = time.monotonic()
+                self._cond.notify_all()
+
+    def _ended_early(self):
+        if not self.duration:
+            return False
+
+        position = self.timestamp + self.produced * self.frame_duration
+        return position < self.duration - EARLY_EOF_TOLERANCE
+
+    def _kill_ffmpeg(self):
+        with self._ffmpeg_lock:
+            if self._ffmpeg:
+                self._ffmpeg.cleanup()
+                self._ffmpeg = None
+                governor.release_ffmpeg(self)
+
+    def is_stuck(self, timeout):
+        """Whether ffmpeg has not produced a frame for the timeout, even
+        though there is room for it in the buffer."""
+
+        if self._done or len(self._buffer) >= BUFFER_FRAMES:
+            return False
+        return time.monotonic() - self.last_frame_at > timeout
+
+    def restart(self):
+        """Kills ffmpeg, the supervising thread resumes the stream."""
+
+        self.last_frame_at = time.monotonic()
+        self._restarting = True
+        self._kill_ffmpeg()
+
+    def read(self):
+        # never waits for ffmpeg, a shared sender thread reads the sources
+        # of many guilds in a row and one starving guild must not delay them
+        with self._cond:
+            if self._buffer:
+                self.frames += 1
+                data = self._buffer.popleft()
+                self._cond.notify_all()
+                return data
+            if self._done:
+                return b""
+
+        # underrun, ffmpeg is connecting or the upstream has stalled
+        if self.stats:
+            self.stats.underruns += 1
+        if time.monotonic() - self.last_frame_at > STALL_TIMEOUT:
+            self.last_frame_at = time.monotonic()
+            # killing ffmpeg waits for it to exit, the sender must not
+            threading.Thread(target=self.restart, daemon=True).start()
+
+        return SILENCE_FRAME
+
+    def cleanup(self):
+        with self._cond:
+            self._closed = True
+            self._buffer.clear()
+            self._cond.notify_all()
+        self._kill_ffmpeg()
@@ -0,0 +1,233 @@
+import random
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+from cogs.music.governor import CapacityError
+
+BASE_DELAY = 2  # seconds of backoff after the first throttled extraction
+MAX_DELAY = 60
+JITTER = 0.5  # share of the delay randomized, so retries do not align
+MAX_ATTEMPTS = 3  # per extraction, including the first one
+# seconds an extraction may sleep off a backoff, longer ones fail fast, so
+# that sleeping extractions do not hold threads of the shared executor
+MAX_WAIT = 1
+TRANSIENT_DELAY = 0.5  # seconds before retrying a transient failure
+BREAKER_THRESHOLD = 3  # throttled extractions in a row that open the breaker
+BREAKER_COOLDOWN = 60  # seconds the breaker stays open at first
+MAX_COOLDOWN = 30 * 60
+
+THROTTLED = "throttled"
+UNAVAILABLE = "unavailable"
+TRANSIENT = "transient"
+
+THROTTLE_PATTERNS = re.compile(
+    r"429|too many requests|not a bot|captcha|rate.?limit",
+    re.IGNORECASE,
+)
+UNAVAILABLE_PATTERNS = re.compile(
+    r"unavailable|private video|removed|not available|unsupported url"
+    r"|does not exist|404|copyright|age.?restrict|sign in to confirm your age",
+    re.IGNORECASE,
+)
+
+
+class ExtractionError(Exception):
+    """Extraction did not give any info about the URL or search."""
+
+
+class ThrottledError(ExtractionError):
+    """The host throttles us, extraction is not even attempted for now."""
+
+    def __init__(self, host, retry_after):
+        super().__init__(
+            f"{host} is limiting requests of the bot, "
+            f"try it again in {int(retry_after) + 1} seconds."
+        )
+        self.host = host
+        self.retry_after = retry_after
+
+
+def classify(err):
+    """Tells whether an extraction error is caused by throttling, by the
+    content itself (no point in retrying) or by something transient.
+
+    Args:
+        err (Exception): error raised by the extraction
+
+    Returns:
+        str: THROTTLED, UNAVAILABLE or TRANSIENT
+    """
+
+    message = str(err)
+    if THROTTLE_PATTERNS.search(message):
+        return THROTTLED
+    if UNAVAILABLE_PATTERNS.search(message):
+        return UNAVAILABLE
+    return TRANSIENT
+
+
+def get_host(url):
+    """Gets the host that an URL or search term gets extracted from."""
+
+    if re.match(r"^[a-z]+search\d*:", url):  # ytsearch10:, scsearch: ...
+        return "youtube.com" if url.startswith("yt") else url.split(":")[0]
+
+    host = urlparse(url).hostname
+    if not host:  # plain search term, searched on youtube by default
+        return "youtube.com"
+
+    host = re.sub(r"^(www|m|music)\.", "", host)
+    return "youtube.com" if host == "youtu.be" else host
+
+
+class HostState:
+    def __init__(self):
+        self.throttled = 0  # throttled extractions in a row
+        self.backoff_until = 0
+        self.open_until = 0  # breaker is open until then
+        self.cooldown = BREAKER_COOLDOWN
+        self.trial = False  # an extraction is testing the half-open breaker
+
+
+class ThrottledExtractor:
+    """Wraps an extraction function with per-host adaptive backoff and a
+    circuit breaker.
+
+    Throttled extractions (429, bot checks) set an exponential backoff
+    with jitter for the host and raise ThrottledError right away, they are
+    not retried. Later extractions of the host wait out at most MAX_WAIT
+    of the backoff and fail fast with ThrottledError if it is longer, so
+    callers can serve from cache instead. Transient failures are retried
+    up to MAX_ATTEMPTS times. After BREAKER_THRESHOLD throttled
+    extractions in a row the breaker opens and extractions from the host
+    fail fast for its cooldown. Once the cooldown passes, one extraction
+    is let through; if it is throttled again, the breaker opens for twice
+    as long.
+
+    Args:
+        extract (Callable[[str], Dict | None]): extraction function taking
+            an URL or search term, e.g. a fake one injecting throttling
+        clock (Callable[[], float], optional): Defaults to time.monotonic.
+        sleep (Callable[[float], None], optional): Defaults to time.sleep.
+    """
+
+    def __init__(self, extract, clock=time.monotonic, sleep=time.sleep):
+        self._extract = extract
+        self._clock = clock
+        self._sleep = sleep
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url, *args, **kwargs):
+        """Extracts info about the URL, blocking for at most MAX_WAIT per
+        attempt while backing off.
+
+        Raises:
+            ThrottledError: the host throttled the extraction, its breaker
+                is open or it backs off longer than MAX_WAIT
+            ExtractionError: extraction failed or gave nothing
+            CapacityError: raised by the extraction, passed on as it is
+
+        Returns:
+            Dict: extracted info
+        """
+
+        host = get_host(url)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self._wait(host)
+            try:
+                info = self._extract(url, *args, **kwargs)
+            except CapacityError:
+                raise  # the bot's own limit, nothing to do with the host
+            except Exception as err:
+                kind = classify(err)
+                retry_after = self._failed(host, kind)
+                if kind == THROTTLED:
+                    # the backoff is longer than MAX_WAIT, not retried here
+                    raise ThrottledError(host, retry_after) from err
+                if kind == UNAVAILABLE or attempt == MAX_ATTEMPTS:
+                    raise ExtractionError(str(err)) from err
+                self._sleep(self._jittered(TRANSIENT_DELAY))
+                continue
+
+            self._succeeded(host)
+            if info is None:
+                raise ExtractionError(f"Nothing was found for {url}.")
+            return info
+
+    def _state(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = HostState()
+        return self._hosts[host]
+
+    def _wait(self, host):
+        with self._lock:
+            state = self._state(host)
+            now = self._clock()
+            if now < state.open_until:
+                raise ThrottledError(host, state.open_until - now)
+            delay = state.backoff_until - now
+            half_open = state.throttled >= BREAKER_THRESHOLD
+            # half-open, only one extraction tries if it passes now
+            if half_open and state.trial:
+                raise ThrottledError(host, max(delay, 0))
+            if delay > MAX_WAIT:
+                raise ThrottledError(host, delay)
+            state.trial = half_open
+
+        if delay > 0:
+            self._sleep(delay)
+
+    def _failed(self, host, kind):
+        """Records a failed extraction.
+
+        Returns:
+            float | None: seconds until the host may be tried again, None
+                unless it was throttled
+        """
+
+        with self._lock:
+            state = self._state(host)
+            state.trial = False
+            if kind != THROTTLED:
+                return
+
+            state.throttled += 1
+            now = self._clock()
+
+            delay = min(BASE_DELAY * 2 ** (state.throttled - 1), MAX_DELAY)
+            state.backoff_until = now + self._jittered(delay)
+
+            if state.throttled >= BREAKER_THRESHOLD:
+                state.open_until = now + self._jittered(state.cooldown)
+                state.cooldown = min(state.cooldown * 2, MAX_COOLDOWN)
+                print(f"Extraction from {host} paused, it throttles us.")
+
+            return max(state.backoff_until, state.open_until) - now
+
+    def _succeeded(self, host):
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    @staticmethod
+    def _jittered(delay):
+        return delay * (1 - JITTER / 2 + JITTER * random.random())
+
+    def summary(self):
+        """Describes throttled hosts for the diagnostics command."""
+
+        now = self._clock()
+        summary = ""
+        with self._lock:
+            for host, state in self._hosts.items():
+                if not state.throttled:
+                    continue
+                summary += f"{host}: throttled {state.throttled}x, "
+                if now < state.open_until:
+                    summary += f"paused for {state.open_until - now:.0f}s\n"
+                else:
+                    summary += "backing off\n"
+
+        return summary
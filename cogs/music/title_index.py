@@ -0,0 +1,96 @@
+import bisect
+import collections
+import heapq
+import re
+
+from cogs.music.request_log import request_log
+
+MAX_SUGGESTIONS = 25  # discord's limit of autocomplete choices
+MAX_CHOICE_LENGTH = 100
+
+
+def tokenize(text):
+    return re.findall(r"\w+", text.lower())
+
+
+class TitleIndex:
+    """In-memory prefix index over titles of previously requested tracks,
+    answering autocomplete without any network call.
+
+    Every token of a title is kept in one sorted list of (token, URL)
+    pairs. All tokens starting with a prefix form a contiguous slice of it
+    that is found by bisection. Tracks are ranked by how often they have
+    been requested.
+    """
+
+    def __init__(self):
+        self.titles = {}  # webpage_url: title
+        self.requests = collections.Counter()  # webpage_url: request count
+        self._tokens = []  # sorted (token, webpage_url)
+
+    def rebuild(self, events):
+        """Builds the index from scratch out of request events."""
+
+        self.titles.clear()
+        self.requests.clear()
+        for event in events:
+            self.requests[event.webpage_url] += 1
+            if len(event.webpage_url) <= MAX_CHOICE_LENGTH:
+                self.titles[event.webpage_url] = event.title
+
+        self._tokens = sorted(
+            (token, url)
+            for url, title in self.titles.items()
+            for token in set(tokenize(title))
+        )
+
+    def add(self, event):
+        """Adds a single request event to the index."""
+
+        url = event.webpage_url
+        self.requests[url] += 1
+        if url in self.titles or len(url) > MAX_CHOICE_LENGTH:
+            return
+
+        self.titles[url] = event.title
+        for token in set(tokenize(event.title)):
+            bisect.insort(self._tokens, (token, url))
+
+    def _match(self, prefix):
+        urls = set()
+        index = bisect.bisect_left(self._tokens, (prefix,))
+        while index < len(self._tokens):
+            token, url = self._tokens[index]
+            if not token.startswith(prefix):
+                break
+            urls.add(url)
+            index += 1
+
+        return urls
+
+    def search(self, query, limit=MAX_SUGGESTIONS):
+        """Finds tracks whose title has words starting with every word of
+        the query, most requested ones first.
+
+        Args:
+            query (str): text typed so far
+            limit (int, optional): Defaults to MAX_SUGGESTIONS.
+
+        Returns:
+            List[Tuple[str, str]]: title and webpage URL of found tracks
+        """
+
+        tokens = tokenize(query)
+        if tokens:
+            # the shortest (most selective) matches go first
+            matches = sorted((self._match(t) for t in tokens), key=len)
+            urls = set.intersection(*matches)
+        else:
+            urls = self.titles.keys()
+
+        ranked = heapq.nlargest(limit, urls, key=self.requests.__getitem__)
+        return [(self.titles[url], url) for url in ranked]
+
+
+title_index = TitleIndex()
+request_log.subscribe(title_index.add)
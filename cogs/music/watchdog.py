@@ -0,0 +1,118 @@
+import asyncio
+import collections
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+PING_INTERVAL = 0.25  # seconds between measurements of the loop's lag
+STALL_THRESHOLD = 0.5  # lag in seconds at which the loop's stack is taken
+LAG_SAMPLES = 2400  # measurements kept for percentiles, ~10 minutes
+MAX_STALLS = 10  # captured stalls kept for the diagnostics
+MAX_STACK_FRAMES = 15
+
+Stall = collections.namedtuple("Stall", ("date", "lag", "task", "stack"))
+
+
+class LoopWatchdog:
+    """Measures lag of the event loop from a separate thread.
+
+    The thread schedules a callback on the loop and measures how late it
+    runs. While a callback is late by more than STALL_THRESHOLD, something
+    is blocking the loop (and with it every interaction acknowledgement),
+    so the stack of the loop's thread and its running task get captured
+    while it still blocks.
+    """
+
+    def __init__(self):
+        self.lags = collections.deque(maxlen=LAG_SAMPLES)
+        self.stalls = collections.deque(maxlen=MAX_STALLS)
+
+        self._loop = None
+        self._loop_thread_id = None
+        self._thread = None
+        self._answered = threading.Event()
+
+    def start(self, loop):
+        """Starts watching the loop. Call it from within the loop, bots of
+        one process share it, so it starts only once."""
+
+        if self._thread is not None:
+            return
+
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        while not self._loop.is_closed():
+            self._answered.clear()
+            sent = time.perf_counter()
+            try:
+                self._loop.call_soon_threadsafe(self._answer, sent)
+            except RuntimeError:  # loop got closed
+                return
+
+            if not self._answered.wait(STALL_THRESHOLD):
+                self._capture(sent)
+                self._answered.wait()
+
+            time.sleep(PING_INTERVAL)
+
+    def _answer(self, sent):
+        self.lags.append(time.perf_counter() - sent)
+        self._answered.set()
+
+    def _capture(self, sent):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+
+        stack = "".join(traceback.format_stack(frame)[-MAX_STACK_FRAMES:])
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        coro = task.get_coro() if task else None
+        task_name = getattr(coro, "__qualname__", "callback (not a task)")
+
+        lag = time.perf_counter() - sent
+        self.stalls.append(Stall(datetime.now(), lag, task_name, stack))
+        print(f"Event loop blocked for {lag:.2f}s+ in {task_name}")
+
+    def percentiles(self, *shares):
+        """Gets lag in seconds below which the given shares of measurements
+        are, e.g. percentiles(0.5, 0.99) for median and 99th percentile."""
+
+        lags = sorted(self.lags)
+        if not lags:
+            return [0.0] * len(shares)
+
+        return [
+            lags[min(int(share * len(lags)), len(lags) - 1)]
+            for share in shares
+        ]
+
+    def summary(self):
+        """Describes the loop's lag for the diagnostics command."""
+
+        p50, p95, p99 = self.percentiles(0.5, 0.95, 0.99)
+        max_lag = max(self.lags, default=0.0)
+        summary = (
+            f"Loop lag p50/p95/p99/max: {p50 * 1000:.1f}/{p95 * 1000:.1f}/"
+            f"{p99 * 1000:.1f}/{max_lag * 1000:.1f} ms\n"
+            f"Loop stalls: {len(self.stalls)}"
+        )
+        if self.stalls:
+            stall = self.stalls[-1]
+            summary += (
+                f", last {stall.date:%H:%M:%S} in {stall.task} "
+                f"({stall.lag:.2f}s+)"
+            )
+
+        return summary + "\n"
+
+
+watchdog = LoopWatchdog()
@@ -0,0 +1,79 @@
+import contextlib
+import threading
+
+import yt_dlp
+
+MAX_USES = 100  # extractions after which an instance gets replaced
+MAX_IDLE = 8  # instances kept around between extractions
+
+
+class YoutubeDLPool:
+    """YoutubeDL instances handed out to one executor thread at a time.
+
+    A YoutubeDL instance is not meant to be used by several threads at
+    once, but creating one per extraction would throw away its opener with
+    cookies and the player JS and signature functions its extractors cache.
+    So instances are reused, each by one extraction at a time, and replaced
+    after MAX_USES extractions or once an extraction with them fails.
+
+    Args:
+        options (Dict): options of YoutubeDL instances
+        max_uses (int, optional): Defaults to MAX_USES.
+        max_idle (int, optional): Defaults to MAX_IDLE.
+    """
+
+    def __init__(self, options, max_uses=MAX_USES, max_idle=MAX_IDLE):
+        self.options = options
+        self.max_uses = max_uses
+        self.max_idle = max_idle
+
+        self.created = 0
+        self.recycled = 0
+        self.in_use = 0
+        self._idle = []  # (YoutubeDL, uses)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def instance(self):
+        """Lends an instance for one extraction.
+
+        Yields:
+            yt_dlp.YoutubeDL: instance not used by any other thread
+        """
+
+        with self._lock:
+            if self._idle:
+                ydl, uses = self._idle.pop()  # the most recently used one
+            else:
+                ydl, uses = None, 0
+                self.created += 1
+            self.in_use += 1
+
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL(self.options)
+
+        failed = True
+        try:
+            yield ydl
+            failed = False
+        finally:
+            self._give_back(ydl, uses + 1, failed)
+
+    def _give_back(self, ydl, uses, failed):
+        with self._lock:
+            self.in_use -= 1
+            keep = not failed and uses < self.max_uses
+            keep = keep and len(self._idle) < self.max_idle
+            if keep:
+                self._idle.append((ydl, uses))
+            else:
+                self.recycled += 1
+
+        if not keep:
+            ydl.close()
+
+    def summary(self):
+        return (
+            f"{self.in_use} in use, {len(self._idle)} idle, "
+            f"{self.created} created, {self.recycled} recycled"
+        )
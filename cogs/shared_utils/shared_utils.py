@@ -31,7 +31,8 @@ class SharedUtils(discord.ext.commands.Cog):
         voice_state = member.guild.voice_client
         if not voice_state:
             return
-        members_amount = len(voice_state.channel.members)
+        # voice states are known even when members are not cached
+        members_amount = len(voice_state.channel.voice_states)
 
         # Checks if the bot is connected in the voice channel and
         # whether theres only 1 member connected to it (the bot itself)
@@ -1,6 +1,8 @@
+import asyncio
 import json
 import os
 import sys
+import time
 from glob import glob
 from pathlib import Path
 
@@ -8,20 +10,55 @@ import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
+try:
+    import uvloop
+except ImportError:  # the default asyncio event loop is used
+    uvloop = None
+
+
+LEAN_MAX_MESSAGES = 100  # messages cached in lean mode, default is 1000
+
+
+def get_lean_intents():
+    """Gets the intents that music needs: guilds and voice states, and
+    guild messages with their content for prefix commands. No members,
+    presences or DMs are received."""
+
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.voice_states = True
+    intents.guild_messages = True
+    intents.message_content = True
+
+    return intents
+
 
 class MyBot(commands.Bot):
     def __init__(self, variables):
+        if variables["lean"]:
+            # members are neither chunked at startup nor cached, the ones
+            # in voice are known from voice states
+            options = {
+                "intents": get_lean_intents(),
+                "chunk_guilds_at_startup": False,
+                "member_cache_flags": discord.MemberCacheFlags.none(),
+                "max_messages": LEAN_MAX_MESSAGES,
+            }
+        else:
+            options = {"intents": discord.Intents().all()}
+
         super().__init__(
             command_prefix=variables["prefix"],
             application_id=variables["app_id"],
-            intents=discord.Intents().all(),
+            **options,
         )
         self.cog_blacklist = variables["cog_blacklist"]
         self.activity_str = variables["activity"]
+        self.started_at = time.perf_counter()
 
     @commands.Cog.listener()
     async def on_ready(self):
-        await bot.change_presence(
+        await self.change_presence(
             activity=discord.Activity(
                 type=discord.ActivityType.listening,
                 name=self.activity_str,
@@ -29,8 +66,9 @@ class MyBot(commands.Bot):
             status=discord.Status.online,
         )
 
-        msg = f"{bot.user.name} logged in with {discord.__version__} version."
-        print(msg)
+        msg = f"{self.user.name} logged in with {discord.__version__} version."
+        startup = time.perf_counter() - self.started_at
+        print(f"{msg} Ready {startup:.1f}s after start.")
 
     async def setup_hook(self):
         py_files = {
@@ -48,38 +86,63 @@ class MyBot(commands.Bot):
                         .replace(".py", "")
                         .replace("/", ".")
                     )
-                    await bot.load_extension(path)
+                    await self.load_extension(path)
                     print(f"{dir_name} module has been loaded.")
                 except Exception as err:
                     print(f"{dir_name} module cannot be loaded. [{err}]")
 
         # is this necessary? SERVER_ID
-        await bot.tree.sync(guild=discord.Object(id=os.environ["SERVER_ID"]))
+        await self.tree.sync(guild=discord.Object(id=os.environ["SERVER_ID"]))
 
-def load_essentials():
-    """Loads essential variables for launching the bot.
+def get_bot_names(bots_settings):
+    """Gets names of bots to run from command line arguments, 'all' runs
+    every bot from config.json. All of them run in this one process.
+
+    Args:
+        bots_settings (Dict[str, dict]): bots_settings of config.json
 
     Returns:
-        Dict[str, str]: variables - token, app. ID, prefix, cog blacklist
+        List[str]: names of bots
     """
 
-    error_msgs = ""
+    bot_names = sys.argv[1:] or ["caroline"]
+    if bot_names == ["all"]:
+        bot_names = list(bots_settings)
+
+    return bot_names
+
+
+def load_bots_settings():
+    """Loads settings of all bots from config.json."""
 
     src_dir = Path(__file__).parents[0]
     json_path = Path(f"{src_dir}/config.json")
-    if Path(json_path).is_file():
-        with open(json_path, encoding="utf-8") as file:
-            bots_settings = json.load(file)["bots_settings"]
-    else:
-        error_msgs += "'config.json' not found!\n"
-
-    if len(sys.argv) > 1:
-        bot_name = sys.argv[1]
-    else:
-        bot_name = "caroline"
-
-    token = os.environ[f"{bot_name}_TOKEN"]
-    app_id = os.environ[f"{bot_name}_ID"]
+    if not Path(json_path).is_file():
+        sys.exit("'config.json' not found!\n")
+
+    with open(json_path, encoding="utf-8") as file:
+        return json.load(file)["bots_settings"]
+
+
+def load_essentials(bots_settings, bot_name):
+    """Loads essential variables for launching the bot.
+
+    Args:
+        bots_settings (Dict[str, dict]): bots_settings of config.json
+        bot_name (str): name of the bot
+
+    Returns:
+        Dict[str, str]: variables - token, app. ID, prefix, cog blacklist,
+            lean gateway mode
+    """
+
+    error_msgs = ""
+
+    if bot_name not in bots_settings:
+        sys.exit(f"{bot_name} is not in config.json!\n")
+
+    token = os.environ.get(f"{bot_name}_TOKEN")
+    app_id = os.environ.get(f"{bot_name}_ID")
     prefix = bots_settings[bot_name]["prefix"]
     activity = bots_settings[bot_name]["activity"]
     if not token:
@@ -98,14 +161,38 @@ def load_essentials():
         "app_id": app_id,
         "prefix": prefix,
         "activity": activity,
-        "cog_blacklist": bots_settings[bot_name]["cog_blacklist"]
+        "cog_blacklist": bots_settings[bot_name]["cog_blacklist"],
+        "lean": bots_settings[bot_name].get("lean", False),
     }
 
-load_dotenv()
-bot_vars = load_essentials()
 
-bot = MyBot(bot_vars)
-bot.run(bot_vars["token"])
+async def run_bots(bots_vars):
+    """Runs the bots concurrently on one event loop, so that they share
+    the interpreter and everything module-level in the cogs - extraction
+    scheduler, stream and metadata caches, request log, executor - while
+    keeping their own tokens, prefixes and cog blacklists."""
+
+    async def run_bot(bot_vars):
+        async with MyBot(bot_vars) as bot:
+            await bot.start(bot_vars["token"])
+
+    await asyncio.gather(*(run_bot(bot_vars) for bot_vars in bots_vars))
+
+
+# guarded, as processes spawned by the cogs (chart rendering) import this
+# module again and must not start the bots a second time
+if __name__ == "__main__":
+    load_dotenv()
+    bots_settings = load_bots_settings()
+    bots_vars = [
+        load_essentials(bots_settings, bot_name)
+        for bot_name in get_bot_names(bots_settings)
+    ]
+
+    discord.utils.setup_logging()
+    if uvloop and os.environ.get("UVLOOP"):
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(run_bots(bots_vars))
 
 # pylint: disable=<err_name> (pylint)
 # type: ignore (mypy)
@@ -0,0 +1,53 @@
+"""Times DSPTransformer against discord.PCMVolumeTransformer per frame.
+
+Run with: python -m tests.bench_dsp
+"""
+
+import timeit
+
+import discord
+
+from cogs.music.dsp import DSPTransformer
+from tests.test_dsp import FakeSource, sine
+
+FRAMES = 3000  # one minute of audio
+REPEAT = 5
+
+
+def bench(make_transformer):
+    signal = sine(FRAMES)
+
+    def run():
+        transformer = make_transformer(FakeSource(signal))
+        while transformer.read():
+            pass
+
+    # creating the fake source is timed as well, subtracted below
+    baseline = min(timeit.repeat(lambda: FakeSource(signal), number=1))
+    best = min(timeit.repeat(run, number=1, repeat=REPEAT))
+    return (best - baseline) / FRAMES * 1e6  # microseconds per frame
+
+
+def main():
+    results = {
+        "PCMVolumeTransformer": bench(
+            lambda source: discord.PCMVolumeTransformer(source, volume=0.5)
+        ),
+        "DSPTransformer": bench(
+            lambda source: DSPTransformer(source, volume=0.5)
+        ),
+    }
+
+    def with_eq(source):
+        transformer = DSPTransformer(source, volume=0.5)
+        transformer.bass = 6
+        return transformer
+
+    results["DSPTransformer + EQ"] = bench(with_eq)
+
+    for name, per_frame in results.items():
+        print(f"{name:<24} {per_frame:7.1f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
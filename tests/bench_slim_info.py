@@ -0,0 +1,180 @@
+"""Measures the memory held by /search results and a 200 track playlist,
+as full yt-dlp info and as slim_info of a flat extraction.
+
+The info dicts are modelled after what yt-dlp extracts from a YouTube
+video (formats, thumbnails, captions and their URLs), so the numbers do
+not depend on the network.
+
+Run with: python -m tests.bench_slim_info
+"""
+
+import gc
+import tracemalloc
+
+from cogs.music.source import slim_info
+
+PLAYLIST_SIZE = 200
+SEARCH_SIZE = 10  # entries of ytsearch10:
+FORMATS = 24
+THUMBNAILS = 42
+CAPTION_LANGUAGES = 157
+CAPTION_FORMATS = ("json3", "srv1", "srv2", "srv3", "ttml", "vtt")
+
+
+def stream_url(video_id, itag):
+    # real googlevideo URLs are ~1000 characters of signed parameters
+    return (
+        f"https://rr3---sn-4g5e6nsz.googlevideo.com/videoplayback?"
+        f"id={video_id}&itag={itag}&" + "&".join(
+            f"param{i}={video_id * 4}" for i in range(20)
+        )
+    )
+
+
+def video_info(index):
+    """Info of a video as extracted without extract_flat."""
+
+    video_id = f"vid{index:08d}"
+    webpage_url = f"https://www.youtube.com/watch?v={video_id}"
+    formats = [
+        {
+            "format_id": str(itag),
+            "format_note": "medium",
+            "url": stream_url(video_id, itag),
+            "ext": "webm" if itag % 2 else "mp4",
+            "acodec": "opus" if itag < 4 else "none",
+            "vcodec": "none" if itag < 4 else "vp9",
+            "abr": 48 + 32 * itag if itag < 4 else None,
+            "tbr": 100.0 + itag,
+            "asr": 48000,
+            "filesize": 3_000_000 + itag,
+            "width": None if itag < 4 else 256 * itag,
+            "height": None if itag < 4 else 144 * itag,
+            "fps": None if itag < 4 else 30,
+            "quality": itag,
+            "protocol": "https",
+            "http_headers": {
+                "User-Agent": "Mozilla/5.0 (X11; Linux x86_64)",
+                "Accept": "text/html,application/xhtml+xml,application/xml",
+                "Accept-Language": "en-us,en;q=0.5",
+                "Sec-Fetch-Mode": "navigate",
+            },
+            "downloader_options": {"http_chunk_size": 10485760},
+            "format": f"{itag} - audio only (medium)",
+        }
+        for itag in range(FORMATS)
+    ]
+    captions = {
+        f"lang{lang}": [
+            {
+                "ext": ext,
+                "url": (
+                    f"https://www.youtube.com/api/timedtext?v={video_id}"
+                    f"&lang=lang{lang}&fmt={ext}&" + "x" * 300
+                ),
+                "name": f"Language {lang}",
+            }
+            for ext in CAPTION_FORMATS
+        ]
+        for lang in range(CAPTION_LANGUAGES)
+    }
+    return {
+        "id": video_id,
+        "title": f"Track number {index} (Official Audio)",
+        "webpage_url": webpage_url,
+        "original_url": webpage_url,
+        "duration": 180 + index,
+        "view_count": 1000 * index,
+        "description": "Lyrics, credits and links. " * 40,
+        "tags": [f"tag{i}" for i in range(20)],
+        "categories": ["Music"],
+        "channel": "Some channel",
+        "uploader": "Some uploader",
+        "formats": formats,
+        "thumbnails": [
+            {
+                "url": f"https://i.ytimg.com/vi/{video_id}/{i}.jpg",
+                "preference": -i,
+                "id": str(i),
+                "width": 120 * i,
+                "height": 90 * i,
+            }
+            for i in range(THUMBNAILS)
+        ],
+        "automatic_captions": captions,
+        "subtitles": {},
+        "heatmap": [
+            {"start_time": i, "end_time": i + 1, "value": 0.5}
+            for i in range(100)
+        ],
+        # yt-dlp's pick of the best audio format
+        **formats[3],
+    }
+
+
+def flat_entry(index):
+    """Entry of a playlist or search extracted with extract_flat."""
+
+    video_id = f"vid{index:08d}"
+    return {
+        "_type": "url",
+        "ie_key": "Youtube",
+        "id": video_id,
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "title": f"Track number {index} (Official Audio)",
+        "duration": 180 + index,
+        "view_count": 1000 * index,
+        "channel": "Some channel",
+        "thumbnails": [
+            {
+                "url": f"https://i.ytimg.com/vi/{video_id}/{i}.jpg",
+                "height": 90 * i,
+                "width": 120 * i,
+            }
+            for i in range(4)
+        ],
+        "description": None,
+    }
+
+
+def playlist(entry, size):
+    return {
+        "_type": "playlist",
+        "id": "PLbenchmark",
+        "title": "Benchmark playlist",
+        "webpage_url": "https://www.youtube.com/playlist?list=PLbenchmark",
+        "entries": [entry(index) for index in range(size)],
+    }
+
+
+def retained(build):
+    """Bytes still allocated by build() once it returns its result."""
+
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    cases = {
+        "/search": SEARCH_SIZE,
+        f"playlist of {PLAYLIST_SIZE}": PLAYLIST_SIZE,
+    }
+    for name, size in cases.items():
+        full = retained(lambda: playlist(video_info, size))
+        slim_full = retained(lambda: slim_info(playlist(video_info, size)))
+        slim_flat = retained(lambda: slim_info(playlist(flat_entry, size)))
+
+        print(name)
+        print(f"  full info         {full / 2**10:10.1f} KiB")
+        print(f"  slim_info         {slim_full / 2**10:10.1f} KiB")
+        print(f"  slim_info, flat   {slim_flat / 2**10:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import discord
+import numpy as np
+import pytest
+
+from cogs.music import dsp
+from cogs.music.dsp import CHANNELS, FRAME_SIZE, DSPTransformer
+
+SAMPLES = FRAME_SIZE // 2 // CHANNELS  # per channel in one frame
+
+
+class FakeSource(discord.AudioSource):
+    """Gives the PCM of the signal frame by frame."""
+
+    def __init__(self, signal):
+        pcm = np.repeat(signal[:, np.newaxis], CHANNELS, axis=1)
+        data = (pcm * 32767).astype(np.int16).tobytes()
+        self.frames = iter(
+            data[i : i + FRAME_SIZE] for i in range(0, len(data), FRAME_SIZE)
+        )
+
+    def read(self):
+        return next(self.frames, b"")
+
+    def cleanup(self):
+        pass
+
+
+def constant(level, frames):
+    return np.full(frames * SAMPLES, level, dtype=np.float32)
+
+
+def sine(frames, frequency=440, amplitude=0.5):
+    t = np.arange(frames * SAMPLES) / dsp.SAMPLING_RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def read_all(transformer):
+    """Reads every frame, as floats of the left channel."""
+
+    data = b""
+    while frame := transformer.read():
+        data += frame
+    pcm = np.frombuffer(data, dtype=np.int16).reshape(-1, CHANNELS)
+    return pcm[:, 0] / 32767
+
+
+def test_starts_at_the_given_volume():
+    transformer = DSPTransformer(FakeSource(constant(0.5, 8)), volume=0.1)
+
+    # no ramp down from full volume at the start
+    assert read_all(transformer) == pytest.approx(0.05, abs=1e-3)
+
+
+def test_volume_changes_are_ramped():
+    transformer = DSPTransformer(FakeSource(constant(0.5, 200)), volume=1.0)
+    transformer.volume = 0.5
+    out = read_all(transformer)
+
+    assert out[0] == pytest.approx(0.5, abs=1e-3)  # no jump
+    assert np.all(np.diff(out) <= 1e-4)  # falls steadily, no clicks
+    ramp_samples = int(dsp.RAMP_SECONDS * dsp.SAMPLING_RATE)
+    assert out[ramp_samples] < 0.5 - 0.5 * 0.5 * 0.5  # most of the way
+    assert out[-1] == pytest.approx(0.25, abs=1e-3)
+
+
+def test_limiter_keeps_peaks_below_full_scale():
+    signal = sine(50, amplitude=1.0)
+    out = read_all(DSPTransformer(FakeSource(signal), volume=4.0))
+
+    assert np.abs(out).max() <= 1.0
+    assert np.abs(out).max() > dsp.LIMIT_THRESHOLD  # compressed, not cut
+    # samples below the threshold pass through untouched
+    quiet = np.abs(signal * 4) < dsp.LIMIT_THRESHOLD
+    assert out[quiet] == pytest.approx(signal[quiet] * 4, abs=1e-3)
+
+
+@pytest.mark.parametrize("bass,treble", [(6, 0), (0, 6), (-6, 6)])
+def test_equalizer_is_continuous_across_batches(monkeypatch, bass, treble):
+    signal = sine(40, frequency=300) + sine(40, frequency=5000, amplitude=0.2)
+
+    def equalize(batch_frames):
+        monkeypatch.setattr(dsp, "BATCH_FRAMES", batch_frames)
+        transformer = DSPTransformer(FakeSource(signal), volume=0.5)
+        transformer.bass = bass
+        transformer.treble = treble
+        return read_all(transformer)
+
+    # the low-pass carries over the end of the previous batch, so batch
+    # boundaries do not show up in the output
+    assert equalize(1) == pytest.approx(equalize(40), abs=2 / 32767)
+    assert equalize(4) == pytest.approx(equalize(40), abs=2 / 32767)
@@ -0,0 +1,69 @@
+import threading
+from unittest import mock
+
+import discord
+
+from cogs.music.scheduler import AudioScheduler
+
+
+class FakeSource(discord.AudioSource):
+    """Gives a fixed amount of frames, already encoded so that no opus
+    library is needed."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.cleaned_up = False
+
+    def read(self):
+        if not self.frames:
+            return b""
+        self.frames -= 1
+        return b"\xf8\xff\xfe"
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+
+def fake_client():
+    client = mock.create_autospec(discord.VoiceClient, instance=True)
+    client.is_connected.return_value = True
+    client.is_playing.return_value = False
+    client.encoder = None
+    return client
+
+
+def test_scheduled_player_sends_every_frame():
+    client = fake_client()
+    source = FakeSource(10)
+    finished = threading.Event()
+    errors = []
+
+    def after(error):
+        errors.append(error)
+        finished.set()
+
+    AudioScheduler(1).play(client, source, after=after)
+
+    assert finished.wait(2)
+    assert errors == [None]
+    assert client.send_audio_packet.call_count == 10
+    assert not client._player.is_playing()
+    assert source.cleaned_up
+
+
+def test_scheduled_player_waits_while_disconnected():
+    client = fake_client()
+    source = FakeSource(10)
+    finished = threading.Event()
+
+    AudioScheduler(1).play(client, source, after=lambda _: finished.set())
+    client.is_connected.return_value = False
+
+    # frames are held back, not dropped, until it is connected again
+    assert not finished.wait(0.2)
+    client.is_connected.return_value = True
+    assert finished.wait(2)
+    assert client.send_audio_packet.call_count == 10
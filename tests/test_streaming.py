@@ -0,0 +1,151 @@
+import http.server
+import shutil
+import struct
+import threading
+import time
+
+import pytest
+
+from cogs.music import streaming
+from cogs.music.streaming import SILENCE_FRAME, StreamingSource
+
+FFMPEG = shutil.which("ffmpeg")
+SAMPLES_PER_FRAME = 960  # 20ms at 48 kHz
+TRACK_FRAMES = 2000  # 40 seconds
+CUT_FRAMES = 1500  # past what ffmpeg reads ahead to probe the input
+
+pytestmark = pytest.mark.skipif(FFMPEG is None, reason="ffmpeg not found")
+
+
+def make_wav():
+    """48 kHz stereo PCM whose samples all hold the number of their frame,
+    counted from 1, so every frame read back tells its position."""
+
+    data = b"".join(
+        struct.pack("<h", frame) * SAMPLES_PER_FRAME * 2
+        for frame in range(1, TRACK_FRAMES + 1)
+    )
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + len(data),
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,  # PCM
+        2,
+        48000,
+        48000 * 4,
+        4,
+        16,
+        b"data",
+        len(data),
+    )
+    return header, data
+
+
+class AudioServer(http.server.ThreadingHTTPServer):
+    """Serves the track with byte ranges for seeking, at /full.wav and at
+    /cut.wav. The latter disconnects after CUT_FRAMES and refuses ranges
+    past them, like an upstream that drops a stream whose URL expired, so
+    that ffmpeg's own reconnects fail too."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), AudioHandler)
+        self.header, self.data = make_wav()
+        self.requests = []
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class AudioHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        body = self.server.header + self.server.data
+        end = len(body)
+        if self.path == "/cut.wav":
+            end = len(self.server.header) + CUT_FRAMES * SAMPLES_PER_FRAME * 4
+
+        start = 0
+        byte_range = self.headers.get("Range", "")
+        if byte_range.startswith("bytes="):
+            start = int(byte_range[6:].split("-")[0])
+        if start >= end:
+            self.send_error(403)
+            return
+
+        if start:
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Content-Length", str(len(body) - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        self.write(body[start:end])
+
+    def write(self, data):
+        try:
+            self.wfile.write(data)
+        except OSError:
+            pass  # ffmpeg got killed
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(streaming, "FFMPEG_PATH", FFMPEG)
+    server = AudioServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def read_all(source, timeout=30):
+    """Reads the source like the voice client until it ends, leaving out
+    silence sent while it recovers."""
+
+    frames = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = source.read()
+        if not data:
+            return frames
+        if data == SILENCE_FRAME:
+            time.sleep(0.005)
+            continue
+        frames.append(struct.unpack_from("<h", data)[0])
+    pytest.fail(f"Stream did not end, {len(frames)} frames read.")
+
+
+def test_resumes_at_frame_position_after_disconnect(server):
+    failed_urls = []
+
+    def resolve(failed_url):
+        failed_urls.append(failed_url)
+        return server.url("/full.wav")
+
+    source = StreamingSource(
+        server.url("/cut.wav"),
+        duration=TRACK_FRAMES // 50,
+        resolve=resolve,
+    )
+    try:
+        frames = read_all(source)
+    finally:
+        source.cleanup()
+
+    # every frame once, in order: resumed exactly where the cut was
+    assert frames == list(range(1, TRACK_FRAMES + 1))
+    assert failed_urls == [server.url("/cut.wav")]
+    assert source.recoveries == 1 <= streaming.MAX_RECOVERIES
+    assert server.requests[0] == "/cut.wav"
+    assert "/full.wav" in server.requests
+
@@ -0,0 +1,164 @@
+import pytest
+
+from cogs.music import throttle
+from cogs.music.governor import CapacityError
+from cogs.music.throttle import (
+    ExtractionError,
+    ThrottledError,
+    ThrottledExtractor,
+)
+
+URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+class FakeHost:
+    """Extraction function with a fake clock, failing with the queued
+    errors before it succeeds."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.errors = []
+        self.calls = 0
+        self.during_call = None  # run inside the extraction
+
+    def extract(self, url):
+        self.calls += 1
+        if self.during_call:
+            self.during_call()
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"webpage_url": url}
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def throttle(self, times=1):
+        self.errors += [Exception("HTTP Error 429: Too Many Requests")] * times
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(throttle.random, "random", lambda: 0.5)
+
+
+@pytest.fixture
+def host():
+    return FakeHost()
+
+
+@pytest.fixture
+def extractor(host):
+    return ThrottledExtractor(
+        host.extract, clock=lambda: host.now, sleep=host.sleep
+    )
+
+
+def throttle_until_open(host, extractor):
+    """Throttles extractions until the breaker opens, at 6s."""
+
+    for i in range(throttle.BREAKER_THRESHOLD):
+        if i:
+            host.now += info.value.retry_after
+        host.throttle()
+        with pytest.raises(ThrottledError) as info:
+            extractor(URL)
+    assert info.value.retry_after == throttle.BREAKER_COOLDOWN
+
+
+def test_throttled_extraction_sets_backoff_window(host, extractor):
+    host.throttle()
+    with pytest.raises(ThrottledError) as info:
+        extractor(URL)
+    assert info.value.retry_after == throttle.BASE_DELAY
+    assert host.calls == 1
+
+    # within the window, extractions fail fast without reaching the host
+    host.now = throttle.BASE_DELAY - throttle.MAX_WAIT - 0.1
+    with pytest.raises(ThrottledError):
+        extractor(URL)
+    assert host.calls == 1
+
+    # the rest of a short window is slept off
+    host.now = throttle.BASE_DELAY - throttle.MAX_WAIT / 2
+    assert extractor(URL) == {"webpage_url": URL}
+    assert host.now == throttle.BASE_DELAY
+    assert host.calls == 2
+
+
+def test_transient_failures_are_retried(host, extractor):
+    host.errors = [Exception("Connection reset by peer")]
+    assert extractor(URL) == {"webpage_url": URL}
+    assert host.calls == 2
+
+    host.errors = [Exception("Connection reset by peer")] * 3
+    with pytest.raises(ExtractionError):
+        extractor(URL)
+    assert host.calls == 2 + throttle.MAX_ATTEMPTS
+
+
+def test_unavailable_is_not_retried(host, extractor):
+    host.errors = [Exception("ERROR: Private video")]
+    with pytest.raises(ExtractionError):
+        extractor(URL)
+    assert host.calls == 1
+
+
+def test_breaker_opens_after_throttled_extractions_in_a_row(host, extractor):
+    throttle_until_open(host, extractor)
+    calls = host.calls
+
+    host.now += throttle.BREAKER_COOLDOWN - 1
+    with pytest.raises(ThrottledError):
+        extractor(URL)
+    with pytest.raises(ThrottledError):
+        extractor("https://youtu.be/dQw4w9WgXcQ")  # same host
+    assert host.calls == calls
+
+    # other hosts are not affected
+    assert extractor("https://soundcloud.com/a/b")
+    assert host.calls == calls + 1
+
+
+def test_half_open_breaker_lets_one_extraction_through(host, extractor):
+    throttle_until_open(host, extractor)
+    host.now += throttle.BREAKER_COOLDOWN
+
+    concurrent = []
+
+    def extract_concurrently():
+        host.during_call = None
+        with pytest.raises(ThrottledError):
+            extractor(URL)
+        concurrent.append(host.calls)
+
+    host.during_call = extract_concurrently
+    assert extractor(URL) == {"webpage_url": URL}
+    assert concurrent == [host.calls]  # it did not reach the host
+
+    # the trial passed, the host is not throttled anymore
+    assert extractor(URL)
+    assert "youtube.com" not in extractor.summary()
+
+
+def test_breaker_cooldown_doubles_when_trial_is_throttled(host, extractor):
+    throttle_until_open(host, extractor)
+    host.now += throttle.BREAKER_COOLDOWN
+
+    host.throttle()
+    with pytest.raises(ThrottledError) as info:
+        extractor(URL)
+    assert info.value.retry_after == 2 * throttle.BREAKER_COOLDOWN
+
+    host.now += 2 * throttle.BREAKER_COOLDOWN - 1
+    with pytest.raises(ThrottledError):
+        extractor(URL)
+    host.now += 1
+    assert extractor(URL)
+
+
+def test_capacity_error_is_passed_through(host, extractor):
+    host.errors = [CapacityError("No free slot.")]
+    with pytest.raises(CapacityError):
+        extractor(URL)
+    assert host.calls == 1
+    assert not extractor.summary()